@@ -1,17 +1,44 @@
 # project/api/main.py
 
-from fastapi import FastAPI
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+import threading
+
+import orjson
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
-from project.chatbot.llm_intent import parse_with_llm
+from project.chatbot.llm_intent import DynBatcher, parse_many_with_llm
 from project.chatbot.intent import parse
-from project.chatbot.actions import rank_professors, details_section
+from project.chatbot.actions import (
+    rank_professors, details_section, refresh_native_warehouse, warm_up, WAREHOUSE_DEFAULT,
+    tracked_cursors, interrupt_cursors,
+)
+
+log = logging.getLogger("api")
+
+# per-request time budgets (seconds)
+LLM_TIMEOUT_S = 15.0
+QUERY_TIMEOUT_S = 2.0
+
+
+@asynccontextmanager
+async def _lifespan(app: FastAPI):
+    # open DuckDB (building the native warehouse if needed) before serving,
+    # so the first request doesn't spend its QUERY_TIMEOUT_S on it
+    global _response_cache_mtime
+    await asyncio.to_thread(warm_up)
+    _response_cache_mtime = _warehouse_mtime()
+    yield
 
 
 app = FastAPI(
     title="UICourseAI API",
     version="0.1.0",
+    lifespan=_lifespan,
 )
 
 # 👇 CORS: allow local dev + GitHub Pages frontend
@@ -29,6 +56,8 @@ app.add_middleware(
 
 class QueryRequest(BaseModel):
     message: str
+    # False forces the rule parser; True lets the router decide
+    use_llm: bool = True
 
 
 class QueryResponse(BaseModel):
@@ -37,37 +66,177 @@ class QueryResponse(BaseModel):
     results: list[dict]
 
 
-@app.get("/")
-def healthcheck():
-    return {"status": "ok", "service": "uicourseai-api"}
+# ---------------------------
+# Caching + LLM batching
+# ---------------------------
+# A query's answer only depends on the (normalized) message and which parser
+# handled it, until the warehouse file changes, so the serialized JSON body
+# is cached. LLM intents don't depend on the warehouse at all, so they are
+# cached separately.
+#
+# A changed warehouse clears the response cache and re-attaches the native
+# DuckDB copy, which would otherwise keep serving the old rows.
 
+RESPONSE_CACHE_SIZE = 512
+LLM_INTENT_CACHE_SIZE = 1024
 
-@app.post("/api/query", response_model=QueryResponse)
-def query_chat(req: QueryRequest):
-    text = req.message.strip()
 
+class _LRUCache:
+    """Small thread-safe LRU map."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[object, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is not None:
+                self._data.move_to_end(key)
+            return hit
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+_response_cache = _LRUCache(RESPONSE_CACHE_SIZE)
+_response_cache_mtime = None
+_llm_intent_cache = _LRUCache(LLM_INTENT_CACHE_SIZE)
+
+# concurrent LLM-bound requests share one completion (up to 8 per batch,
+# waiting at most 80ms for the batch to fill)
+_llm_batcher = DynBatcher(parse_many_with_llm, max_batch_size=8, max_delay=0.08)
+
+
+def _normalize_message(text: str) -> str:
+    # trim + lowercase + collapse whitespace
+    return " ".join(text.lower().split())
+
+
+def _warehouse_mtime():
+    try:
+        return WAREHOUSE_DEFAULT.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+async def _cached_response(key: tuple):
+    global _response_cache_mtime
+    mtime = _warehouse_mtime()
+    if mtime != _response_cache_mtime:
+        # warehouse rebuilt (or removed): every cached answer is stale, and
+        # the attached native copy must be swapped for the new one
+        _response_cache.clear()
+        _response_cache_mtime = mtime
+        await asyncio.to_thread(refresh_native_warehouse)
+        return None
+    return _response_cache.get(key)
+
+
+async def _llm_intent(norm_text: str) -> dict:
+    intent = _llm_intent_cache.get(norm_text)
+    if intent is None:
+        intent = await _llm_batcher.process_batched(norm_text)
+        _llm_intent_cache.put(norm_text, intent)
+    # copy: the cached dict must not be shared with the response
+    return dict(intent)
+
+
+# How often the rule parser was confident enough to skip the LLM.
+_route_stats = {"rule_confident": 0, "rule": 0, "llm": 0}
+
+
+def _rule_intent_is_complete(intent: dict) -> bool:
+    """
+    True when the rule parser already pinned the query down, so the LLM
+    could not change the answer: a subject plus something narrowing it, or a
+    details request for a concrete course.
+    """
+    if intent.get("details"):
+        return bool(intent.get("class_num"))
+    return bool(intent.get("subject")) and bool(
+        intent.get("class_num") or intent.get("level") or intent.get("keywords")
+    )
+
+
+def _wants_llm(text: str) -> bool:
     # simple rule: use LLM for more natural / long questions
-    use_llm = len(text) > 40 or any(
+    return len(text) > 40 or any(
         w in text.lower()
         for w in ["prof", "professor", "chill", "recommend", "advisor"]
     )
 
-    if use_llm:
-        intent = parse_with_llm(text)
-    else:
-        intent = parse(text)
 
+def _query_rows(intent: dict) -> list[dict]:
     # details view vs ranking
     if intent.get("details"):
         subj = intent.get("subject") or ""
         cnum = intent.get("class_num") or ""
         inst = intent.get("instructor_like") or ""
-        rows = details_section(subj, cnum, inst)
+        return details_section(subj, cnum, inst)
+    return rank_professors(intent, top_n=5)
+
+
+@app.get("/")
+def healthcheck():
+    return {"status": "ok", "service": "uicourseai-api", "routing": dict(_route_stats)}
+
+
+@app.post("/api/query", response_model=None, responses={200: {"model": QueryResponse}})
+async def query_chat(req: QueryRequest):
+    text = req.message.strip()
+
+    # the rule parser is cheap: run it first and only pay for the LLM when
+    # its answer is incomplete and the message looks like natural language
+    intent = dict(parse(text))  # parse() results are shared and read-only
+    if _rule_intent_is_complete(intent):
+        use_llm, route = False, "rule_confident"
+    elif not req.use_llm:
+        use_llm, route = False, "rule"
     else:
-        rows = rank_professors(intent, top_n=5)
+        use_llm = _wants_llm(text)
+        route = "llm" if use_llm else "rule"
+    _route_stats[route] += 1
 
-    return QueryResponse(
-        used_llm=use_llm,
-        intent=intent,
-        results=rows,
-    )
+    key = (use_llm, _normalize_message(text))
+    cached = await _cached_response(key)
+    if cached is not None:
+        return Response(content=cached, media_type="application/json")
+
+    llm_failed = False
+    if use_llm:
+        try:
+            intent = await asyncio.wait_for(_llm_intent(key[1]), LLM_TIMEOUT_S)
+        except Exception as e:
+            # keep the rule-based intent rather than failing the request
+            log.warning("LLM intent failed, using rule parser: %r", e)
+            use_llm, llm_failed = False, True
+
+    # DuckDB work is blocking: keep it off the event loop. The worker thread
+    # can't be cancelled, so on timeout interrupt its query instead, which
+    # frees the pooled cursor rather than holding it after the 504
+    with tracked_cursors() as leased:
+        try:
+            rows = await asyncio.wait_for(asyncio.to_thread(_query_rows, intent), QUERY_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            interrupt_cursors(leased)
+            raise HTTPException(status_code=504, detail="Query timed out")
+
+    # plain dicts of primitives: serialize directly instead of validating
+    # through QueryResponse (which is kept for the OpenAPI docs)
+    body = orjson.dumps({"used_llm": use_llm, "intent": intent, "results": rows})
+    if not llm_failed:
+        _response_cache.put(key, body)
+    return Response(content=body, media_type="application/json")
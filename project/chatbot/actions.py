@@ -1,33 +1,67 @@
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
+from functools import lru_cache
 from pathlib import Path
+from contextlib import contextmanager
+from contextvars import ContextVar
 import logging
-import yaml
-import duckdb
+import os
+import queue
+import re
+import threading
+import uuid
 from datetime import datetime
+from itertools import count
+
+if TYPE_CHECKING:
+    import duckdb
+
+# duckdb and yaml are imported on first use, so importing this module (e.g.
+# for the API's startup or a test run that never queries) stays cheap.
 
 log = logging.getLogger("chatbot.actions")
 
 PROJECT_ROOT = Path(__file__).resolve().parents[1]
 
 WAREHOUSE_DEFAULT = PROJECT_ROOT / "data" / "warehouse" / "grades_master.parquet"
+WAREHOUSE_DB = WAREHOUSE_DEFAULT.with_suffix(".duckdb")
 CONFIG_PATH = PROJECT_ROOT / "config" / "app.yaml"
 
 
+@lru_cache(maxsize=1)
 def _load_config() -> Dict:
     if CONFIG_PATH.exists():
+        import yaml
+        try:
+            # libyaml-backed loader is ~10x faster; not every PyYAML build has it
+            from yaml import CSafeLoader as _YamlLoader
+        except ImportError:
+            from yaml import SafeLoader as _YamlLoader
         with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-            return yaml.safe_load(f) or {}
+            return yaml.load(f, Loader=_YamlLoader) or {}
     return {}
 
 
-CFG = _load_config()
-DEFAULT_RECENCY_YEARS = int(CFG.get("default_recency_years", 5))
-MIN_ENROLLMENT = int(CFG.get("min_enrollment", 8))
+def _default_recency_years() -> int:
+    return int(_load_config().get("default_recency_years", 5))
+
+
+def _min_enrollment() -> int:
+    return int(_load_config().get("min_enrollment", 8))
+
+
+# Bump when the columns produced by _base_query change, so existing native
+# warehouse files are rebuilt instead of queried with a stale schema.
+WAREHOUSE_SCHEMA_VERSION = 3
+
+# 'FA23' -> 2023, 'SP24' -> 2024; NULL for anything that isn't <term><yy>
+_YEAR_SQL = "CAST(CASE WHEN LENGTH(semester) = 4 THEN 2000 + TRY_CAST(SUBSTR(semester, 3, 2) AS INTEGER) END AS INTEGER)"
 
 
 def _base_query(warehouse: Path) -> str:
     """
-    Compute rates on-the-fly. Note: source uses 'class_title' (not 'course_title').
+    Warehouse columns plus the derived A_rate / DFW_rate (percent), the
+    semester year and a lower-cased instructor for name matching.
+    Note: source uses 'class_title' (not 'course_title').
     """
     return f"""
         SELECT
@@ -35,140 +69,379 @@ def _base_query(warehouse: Path) -> str:
             class_num,
             class_title,
             instructor,
+            LOWER(instructor) AS instructor_lc,
             semester,
             total_students,
-            CAST(A AS DOUBLE) AS A_raw,
-            CAST(B AS DOUBLE) AS B_raw,
-            CAST(C AS DOUBLE) AS C_raw,
-            CAST(D AS DOUBLE) AS D_raw,
-            CAST(F AS DOUBLE) AS F_raw,
-            CAST(withdrawn AS DOUBLE) AS W_raw,
-            CASE WHEN total_students > 0 THEN (A_raw / total_students) * 100 ELSE 0 END AS A_rate,
-            CASE WHEN total_students > 0 THEN ((D_raw + F_raw + W_raw) / total_students) * 100 ELSE 0 END AS DFW_rate
-        FROM '{warehouse.as_posix()}'
-        WHERE total_students IS NOT NULL AND total_students > 0
+            A, B, C, D, F, withdrawn,
+            CAST(100.0 * A / total_students AS DOUBLE) AS A_rate,
+            CAST(100.0 * (D + F + withdrawn) / total_students AS DOUBLE) AS DFW_rate,
+            {_YEAR_SQL} AS year_int
+        FROM read_parquet('{warehouse.as_posix()}')
+        WHERE total_students > 0
+    """
+
+
+def build_native_warehouse(parquet: Path, db: Path) -> None:
+    """
+    Materialize the Parquet warehouse into DuckDB's native format, with the
+    rate/year columns stored rather than recomputed per scanned row.
+    Written to a temp file first so a half-built database is never attached;
+    the temp name is unique per build, so concurrent builders (API workers,
+    the rebuild script) don't clobber each other and the last one wins.
+    """
+    import duckdb
+
+    tmp = db.with_name(f"{db.stem}.{os.getpid()}-{uuid.uuid4().hex}.duckdb.tmp")
+    try:
+        con = duckdb.connect(str(tmp))
+        try:
+            con.execute(f"CREATE OR REPLACE TABLE grades AS {_base_query(parquet)}")
+            con.execute(f"CREATE TABLE warehouse_meta AS SELECT {WAREHOUSE_SCHEMA_VERSION} AS schema_version")
+        finally:
+            con.close()
+        os.replace(tmp, db)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    finally:
+        Path(f"{tmp}.wal").unlink(missing_ok=True)
+
+
+def native_is_stale(parquet: Path, db: Path) -> bool:
+    import duckdb
+
+    if not db.exists() or db.stat().st_mtime < parquet.stat().st_mtime:
+        return True
+    try:
+        con = duckdb.connect(str(db), read_only=True)
+        try:
+            row = con.execute("SELECT max(schema_version) FROM warehouse_meta").fetchone()
+        finally:
+            con.close()
+    except duckdb.Error:
+        # missing meta table, or a truncated / corrupt file: rebuild it
+        return True
+    return row[0] != WAREHOUSE_SCHEMA_VERSION
+
+
+# One in-process DuckDB for the whole app. The default warehouse is attached
+# read-only from its native .duckdb copy; any other Parquet file (tests,
+# experiments) is registered once as a view with the same columns. Either
+# way a request only plans its own WHERE / ORDER BY / LIMIT. Queries run on
+# pooled cursors (below) because requests arrive from a threadpool. All of
+# it is set up by _connection() on the first query.
+_CON: Optional["duckdb.DuckDBPyConnection"] = None
+_CON_LOCK = threading.Lock()
+_RELATIONS: Dict[Path, str] = {}
+_RELATIONS_LOCK = threading.Lock()
+# view names are never reused, even after refresh_native_warehouse() drops an entry
+_VIEW_IDS = count()
+
+
+def _warehouse_relation(warehouse: Path) -> str:
+    """
+    Return the table/view name to query for `warehouse`, registering it on first use.
+    """
+    key = warehouse.resolve()
+    with _RELATIONS_LOCK:
+        # open the connection first: that is what registers the attached
+        # native warehouse, which must win over a Parquet view
+        con = _connection()
+        name = _RELATIONS.get(key)
+        if name is None:
+            name = f"grades_{next(_VIEW_IDS)}"
+            con.execute(f"CREATE OR REPLACE VIEW {name} AS {_base_query(warehouse)}")
+            _RELATIONS[key] = name
+    return name
+
+
+def _attach_native_warehouse(con: "duckdb.DuckDBPyConnection") -> None:
+    import duckdb
+
+    try:
+        if native_is_stale(WAREHOUSE_DEFAULT, WAREHOUSE_DB):
+            log.info("Building native warehouse %s", WAREHOUSE_DB)
+            build_native_warehouse(WAREHOUSE_DEFAULT, WAREHOUSE_DB)
+        con.execute(f"ATTACH '{WAREHOUSE_DB.as_posix()}' AS wh (READ_ONLY)")
+    except (duckdb.Error, OSError) as e:
+        # fall back to scanning the Parquet file through a view
+        log.warning("Native warehouse unavailable (%s); using Parquet", e)
+        return
+    _RELATIONS[WAREHOUSE_DEFAULT.resolve()] = "wh.grades"
+
+
+# Cursors are cheap clones of _CON that can run queries concurrently. A
+# fixed pool of them is shared by the request threads; a thread waits for a
+# free cursor instead of opening a new one.
+CURSOR_POOL_SIZE = min(os.cpu_count() or 1, 8)
+_CURSOR_POOL: "queue.Queue[duckdb.DuckDBPyConnection]" = queue.Queue()
+
+
+def _connection() -> "duckdb.DuckDBPyConnection":
+    """
+    Return the shared connection, opening it (and filling the cursor pool)
+    on first use.
+    """
+    global _CON
+    if _CON is None:
+        with _CON_LOCK:
+            if _CON is None:
+                import duckdb
+
+                con = duckdb.connect(":memory:")
+                # one task scheduler serves every cursor: concurrent queries
+                # share these threads rather than each spawning its own
+                con.execute(f"SET threads = {os.cpu_count() or 1}")
+                if WAREHOUSE_DEFAULT.exists():
+                    _attach_native_warehouse(con)
+                for _ in range(CURSOR_POOL_SIZE):
+                    _CURSOR_POOL.put(con.cursor())
+                _CON = con
+    return _CON
+
+
+def refresh_native_warehouse() -> None:
+    """
+    Re-attach the native warehouse after the Parquet file was rebuilt. An
+    existing ATTACH keeps reading the replaced .duckdb file, so rebuild the
+    native copy if it is stale, then detach the old one and attach the
+    current file. The swap waits for in-flight queries (it holds every pooled
+    cursor), so no query sees `wh` disappear under it.
+    """
+    import duckdb
+
+    con = _connection()
+    if WAREHOUSE_DEFAULT.exists():
+        # the slow part runs before queries are blocked
+        try:
+            if native_is_stale(WAREHOUSE_DEFAULT, WAREHOUSE_DB):
+                build_native_warehouse(WAREHOUSE_DEFAULT, WAREHOUSE_DB)
+        except (duckdb.Error, OSError) as e:
+            log.warning("Native warehouse rebuild failed (%s)", e)
+    with _RELATIONS_LOCK, _all_cursors():
+        _RELATIONS.pop(WAREHOUSE_DEFAULT.resolve(), None)
+        try:
+            con.execute("DETACH DATABASE IF EXISTS wh")
+        except duckdb.Error as e:
+            log.warning("Could not detach native warehouse: %s", e)
+            return
+        if WAREHOUSE_DEFAULT.exists():
+            _attach_native_warehouse(con)
+
+
+def warm_up() -> None:
+    """
+    Open the connection now rather than on the first query (e.g. from a
+    background thread while the CLI waits for input).
     """
+    _connection()
+
+
+@contextmanager
+def _all_cursors():
+    """Hold every pooled cursor: waits for running queries, blocks new ones."""
+    _connection()
+    held = [_CURSOR_POOL.get() for _ in range(CURSOR_POOL_SIZE)]
+    try:
+        yield
+    finally:
+        for cur in held:
+            _CURSOR_POOL.put(cur)
+
+
+# cursors leased by the queries of the current `tracked_cursors()` block;
+# asyncio.to_thread copies the context, so worker threads see the caller's set
+_TRACKED: ContextVar[Optional[set]] = ContextVar("_TRACKED", default=None)
+_TRACKED_LOCK = threading.Lock()
 
 
-def _semester_year_sql() -> str:
-    # Convert e.g., 'FA23' -> 2023, 'SP24' -> 2024
-    return """
-        CASE
-            WHEN LENGTH(semester) = 4 AND TRY_CAST(SUBSTR(semester, 3, 2) AS INTEGER) IS NOT NULL
-                THEN 2000 + CAST(SUBSTR(semester, 3, 2) AS INTEGER)
-            ELSE NULL
-        END
+@contextmanager
+def tracked_cursors():
     """
+    Record the cursors leased inside the block (including from threads
+    started with asyncio.to_thread), so `interrupt_cursors` can cancel
+    queries whose caller stopped waiting.
+    """
+    leased: set = set()
+    token = _TRACKED.set(leased)
+    try:
+        yield leased
+    finally:
+        _TRACKED.reset(token)
 
 
-def _escape_single_quotes(s: str) -> str:
-    return s.replace("'", "''")
+def interrupt_cursors(leased: set) -> None:
+    """Interrupt the queries still running on `leased` cursors."""
+    with _TRACKED_LOCK:
+        for cur in leased:
+            cur.interrupt()
 
 
-def _apply_filters(sql: str, params: Dict) -> str:
+@contextmanager
+def _lease_cursor():
+    _connection()
+    cur = _CURSOR_POOL.get()
+    leased = _TRACKED.get()
+    if leased is not None:
+        with _TRACKED_LOCK:
+            leased.add(cur)
+    try:
+        yield cur
+    finally:
+        if leased is not None:
+            # under the lock, so an interrupt can't hit the cursor's next user
+            with _TRACKED_LOCK:
+                leased.discard(cur)
+        _CURSOR_POOL.put(cur)
+
+
+def _run(sql: str, args: List) -> List[Dict]:
+    # results are a handful of rows: build the dicts directly rather than
+    # going through a pandas DataFrame
+    with _lease_cursor() as cur:
+        cur.execute(sql, args)
+        rows = cur.fetchall()
+        cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in rows]
+
+
+
+# keyword family -> substrings matched (case-insensitively) in class_title
+_KEYWORD_TERMS = {
+    "ml": ("machine", "learning", "ai"),
+    "ai": ("artificial", "intelligence", "ai"),
+    "data": ("data",),
+    "nlp": ("language", "nlp", "text"),
+    "language": ("language", "nlp", "text"),
+    "query": ("query", "retrieval", "information"),
+    "retrieval": ("query", "retrieval", "information"),
+    "ir": ("query", "retrieval", "information"),
+}
+
+
+def _apply_filters(params: Dict) -> Tuple[Tuple[str, ...], List]:
+    """
+    Translate intent params into WHERE clauses with `?` placeholders plus the
+    values to bind. The clause tuple only depends on which filters are
+    present, so it doubles as a cache key for the SQL text.
+    """
     clauses: List[str] = []
+    args: List = []
 
     if params.get("subject"):
-        clauses.append(f"UPPER(subject) = '{params['subject'].upper()}'")
+        clauses.append("UPPER(subject) = ?")
+        args.append(params["subject"].upper())
     if params.get("class_num"):
-        clauses.append(f"class_num = '{params['class_num']}'")
+        clauses.append("class_num = ?")
+        args.append(str(params["class_num"]))
 
     # level filter: e.g., 500-level -> 500..599
     if params.get("level"):
         lvl = int(params["level"])
-        clauses.append(f"TRY_CAST(class_num AS INTEGER) BETWEEN {lvl} AND {lvl + 99}")
+        clauses.append("TRY_CAST(class_num AS INTEGER) BETWEEN ? AND ?")
+        args.extend([lvl, lvl + 99])
 
-    # keywords: match in class_title
+    # keywords: match in class_title, as one regex alternation so the title is
+    # lowercased and scanned once instead of once per LIKE
     kw = params.get("keywords") or []
-    keyword_clause = []
-    for k in kw:
-        k_low = str(k).lower()
-        if k_low == "ml":
-            keyword_clause.append(
-                "LOWER(class_title) LIKE '%machine%' OR LOWER(class_title) LIKE '%learning%' OR LOWER(class_title) LIKE '%ai%'"
-            )
-        elif k_low == "ai":
-            keyword_clause.append("LOWER(class_title) LIKE '%artificial%' OR LOWER(class_title) LIKE '%intelligence%' OR LOWER(class_title) LIKE '%ai%'")
-        elif k_low == "data":
-            keyword_clause.append("LOWER(class_title) LIKE '%data%'")
-        elif k_low in {"nlp", "language"}:
-            keyword_clause.append("LOWER(class_title) LIKE '%language%' OR LOWER(class_title) LIKE '%nlp%' OR LOWER(class_title) LIKE '%text%'")
-        elif k_low in {"query", "retrieval", "ir"}:
-            keyword_clause.append("LOWER(class_title) LIKE '%query%' OR LOWER(class_title) LIKE '%retrieval%' OR LOWER(class_title) LIKE '%information%'")
-    if keyword_clause:
-        clauses.append("(" + " OR ".join(keyword_clause) + ")")
+    terms = sorted({t for k in kw for t in _KEYWORD_TERMS.get(str(k).lower(), ())})
+    if terms:
+        clauses.append("regexp_matches(LOWER(class_title), ?)")
+        args.append("|".join(re.escape(t) for t in terms))
 
     # instructor partial
     inst = params.get("instructor_like")
     if inst:
-        inst_escaped = _escape_single_quotes(inst.lower())
-        clauses.append(f"LOWER(instructor) LIKE '%{inst_escaped}%'")
+        clauses.append("instructor_lc LIKE ?")
+        args.append(f"%{inst.lower()}%")
 
     # minimum enrollment unless user forced specific class_num
     if not params.get("class_num"):
-        clauses.append(f"total_students >= {MIN_ENROLLMENT}")
+        clauses.append("total_students >= ?")
+        args.append(_min_enrollment())
 
     # recency window
     if params.get("recent"):
         year_now = datetime.now().year
-        ybound = year_now - int(DEFAULT_RECENCY_YEARS)
-        clauses.append(f"{_semester_year_sql()} >= {ybound}")
+        clauses.append("year_int >= ?")
+        args.append(year_now - _default_recency_years())
 
-    if clauses:
-        if "WHERE" in sql:
-            sql += " AND " + " AND ".join(clauses)
-        else:
-            sql += " WHERE " + " AND ".join(clauses)
+    return tuple(clauses), args
 
-    return sql
 
+def _where(clauses: Tuple[str, ...]) -> str:
+    return ("WHERE " + " AND ".join(clauses)) if clauses else ""
 
-def _order_clause(polarity: str) -> str:
-    # tie-breakers: prefer more students, then newer semester
-    if polarity == "hard":
-        return f"ORDER BY DFW_rate DESC, A_rate ASC, total_students DESC, {_semester_year_sql()} DESC"
-    return f"ORDER BY A_rate DESC, DFW_rate ASC, total_students DESC, {_semester_year_sql()} DESC"
 
+# tie-breakers: prefer more students, then newer semester
+_ORDER_CLAUSES = {
+    "easy": "ORDER BY A_rate DESC, DFW_rate ASC, total_students DESC, year_int DESC",
+    "hard": "ORDER BY DFW_rate DESC, A_rate ASC, total_students DESC, year_int DESC",
+}
 
-def rank_professors(params: Dict, top_n: int = 5, warehouse_override: Optional[Path] = None) -> List[Dict]:
-    """
-    Return ranked sections (one row per section) respecting filters.
-    """
-    warehouse = warehouse_override or WAREHOUSE_DEFAULT
-    if not warehouse.exists():
-        log.warning("Warehouse not found at %s", warehouse)
-        return []
 
-    base = _base_query(warehouse)
-    sql = _apply_filters(base, params)
+def _order_clause(polarity: str) -> str:
+    return _ORDER_CLAUSES.get(polarity, _ORDER_CLAUSES["easy"])
 
-    polarity = params.get("polarity", "easy")
-    order = _order_clause(polarity)
 
-    final_sql = f"""
-        WITH ranked AS ({sql})
+@lru_cache(maxsize=256)
+def _rank_sql(relation: str, clauses: Tuple[str, ...], polarity: str) -> str:
+    # single SELECT ... ORDER BY ... LIMIT so DuckDB plans a top-N heap
+    # instead of sorting every filtered row
+    return f"""
         SELECT
             subject,
             class_num,
             class_title,
             instructor,
             semester,
-            CAST(A_rate AS DOUBLE) AS A_rate,
-            CAST(DFW_rate AS DOUBLE) AS DFW_rate,
+            A_rate,
+            DFW_rate,
             CAST(total_students AS BIGINT) AS total_students
-        FROM ranked
-        {order}
-        LIMIT {int(top_n)}
+        FROM {relation}
+        {_where(clauses)}
+        {_order_clause(polarity)}
+        LIMIT ?
     """
 
-    log.info("SQL:\\n%s", final_sql)
-    con = duckdb.connect()
-    try:
-        df = con.execute(final_sql).df()  # small frame; pandas not required
-    finally:
-        con.close()
 
-    return df.to_dict(orient="records")
+@lru_cache(maxsize=64)
+def _details_sql(relation: str, clauses: Tuple[str, ...]) -> str:
+    return f"""
+        SELECT
+            semester,
+            subject,
+            class_num,
+            class_title,
+            instructor,
+            total_students,
+            ROUND(A_rate, 1) AS A_rate,
+            ROUND(DFW_rate, 1) AS DFW_rate
+        FROM {relation}
+        {_where(clauses)}
+        ORDER BY year_int DESC
+        LIMIT 20
+    """
+
+
+def rank_professors(params: Dict, top_n: int = 5, warehouse_override: Optional[Path] = None) -> List[Dict]:
+    """
+    Return ranked sections (one row per section) respecting filters.
+    """
+    warehouse = warehouse_override or WAREHOUSE_DEFAULT
+    if not warehouse.exists():
+        log.warning("Warehouse not found at %s", warehouse)
+        return []
+
+    relation = _warehouse_relation(warehouse)
+    clauses, args = _apply_filters(params)
+    polarity = params.get("polarity", "easy")
+
+    final_sql = _rank_sql(relation, clauses, polarity)
+    args.append(int(top_n))
+
+    log.info("SQL:\n%s\nargs: %s", final_sql, args)
+    return _run(final_sql, args)
 
 
 def details_section(subject: str, class_num: str, instructor_like: str, warehouse_override: Optional[Path] = None) -> List[Dict]:
@@ -179,32 +452,11 @@ def details_section(subject: str, class_num: str, instructor_like: str, warehous
     if not warehouse.exists():
         return []
 
-    base = _base_query(warehouse)
+    relation = _warehouse_relation(warehouse)
     params = {
         "subject": subject,
         "class_num": class_num,
         "instructor_like": instructor_like,
     }
-    sql = _apply_filters(base, params)
-
-    final_sql = f"""
-        WITH s AS ({sql})
-        SELECT
-            semester,
-            subject,
-            class_num,
-            class_title,
-            instructor,
-            total_students,
-            ROUND(A_rate, 1) AS A_rate,
-            ROUND(DFW_rate, 1) AS DFW_rate
-        FROM s
-        ORDER BY {_semester_year_sql()} DESC
-        LIMIT 20
-    """
-    con = duckdb.connect()
-    try:
-        df = con.execute(final_sql).df()
-    finally:
-        con.close()
-    return df.to_dict(orient="records")
+    clauses, args = _apply_filters(params)
+    return _run(_details_sql(relation, clauses), args)
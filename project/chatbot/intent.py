@@ -1,8 +1,10 @@
 # chatbot/intent.py
 from __future__ import annotations
 from dataclasses import dataclass
+from functools import lru_cache
 import re
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Tuple
 
 SUBJECT_CODES = {"CS", "MATH", "STAT", "ECE", "BIOE", "IE", "IDS", "DA", "DS"}  # extend as needed
 
@@ -30,6 +32,26 @@ RECENT_TOKENS = {"recent", "latest", "new", "newer"}
 
 DETAIL_TOKENS = {"details", "detail", "breakdown", "per-semester", "semester"}
 
+# tokens are already lowercased, so subject lookup is a plain set probe
+_SUBJECTS_LOWER = frozenset(s.lower() for s in SUBJECT_CODES)
+
+# synonym -> keyword families, so keyword lookup is one dict probe per token
+# (a synonym can belong to several families, e.g. "ai" is both "ml" and "ai")
+_SYN_TO_KEYS: Dict[str, Tuple[str, ...]] = {}
+for _key, _synonyms in KEYWORD_SYNONYMS.items():
+    for _syn in _synonyms:
+        _SYN_TO_KEYS[_syn] = _SYN_TO_KEYS.get(_syn, ()) + (_key,)
+
+# tokens that can never be an instructor name fragment
+_GARBAGE = frozenset().union(
+    RECENT_TOKENS, DETAIL_TOKENS,
+    POLARITY_MAP.keys(),
+    _SYN_TO_KEYS.keys(),
+    _SUBJECTS_LOWER, {"level"}
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9\-]+")
+
 @dataclass
 class Intent:
     polarity: str = "easy"                     # "easy" or "hard"
@@ -55,87 +77,69 @@ class Intent:
             "details": self.details,
         }
 
-def _tokenize(text: str) -> List[str]:
-    # simple lowercase split; keep alphanum and dashes
-    text = text.lower()
-    return re.findall(r"[a-z0-9\-]+", text)
-
-def _extract_subject(tokens: List[str]) -> Optional[str]:
-    for t in tokens:
-        if t.upper() in SUBJECT_CODES:
-            return t.upper()
+def _level_prefix(t: str) -> Optional[str]:
+    # "500-level" -> "500"
+    if t.endswith("-level"):
+        num = t.split("-")[0]
+        if num.isdigit():
+            return num
     return None
 
-def _extract_class_num(tokens: List[str]) -> Optional[str]:
-    for t in tokens:
-        if t.isdigit():
-            return t
-        # handle 500-level phrasing like "500-level"
-        if t.endswith("-level"):
-            num = t.split("-")[0]
-            if num.isdigit():
-                return num
-    return None
+@lru_cache(maxsize=2048)
+def parse(user_text: str) -> Mapping:
+    """
+    Rule-based intent for `user_text`. Results are cached per text and shared
+    between callers, so they are read-only (keywords is a tuple); callers that
+    need to change an intent copy it first, e.g. dict(parse(text)).
+    """
+    text_lower = user_text.lower()
+    # simple split of the lowercased text; keep alphanum and dashes
+    tokens = _TOKEN_RE.findall(text_lower)
+    intent = Intent()
 
-def _extract_level(tokens: List[str]) -> Optional[int]:
-    # 500-level, 400-level, etc.
+    # one pass over the tokens; "first match wins" for the scalar fields
+    polarity = None
+    keywords = set()
+    name_tail = None   # last token that could be an instructor name fragment
     for i, t in enumerate(tokens):
-        if t.endswith("-level"):
-            num = t.split("-")[0]
-            if num.isdigit():
-                return int(num)
-        if t.isdigit() and i + 1 < len(tokens) and tokens[i+1] == "level":
-            return int(t)
-    return None
+        if polarity is None and t in POLARITY_MAP:
+            polarity = POLARITY_MAP[t]
+        if intent.subject is None and t in _SUBJECTS_LOWER:
+            intent.subject = t.upper()
+        if t in _SYN_TO_KEYS:
+            keywords.update(_SYN_TO_KEYS[t])
+        if t in RECENT_TOKENS:
+            intent.recent = True
+        if t in DETAIL_TOKENS:
+            intent.details = True
 
-def _extract_polarity(tokens: List[str]) -> str:
-    for t in tokens:
-        if t in POLARITY_MAP:
-            return POLARITY_MAP[t]
-    return "easy"
-
-def _extract_keywords(tokens: List[str]) -> List[str]:
-    found = set()
-    for t in tokens:
-        for key, synonyms in KEYWORD_SYNONYMS.items():
-            if t in synonyms:
-                found.add(key)
-    return list(found)
-
-def _extract_recent(tokens: List[str]) -> bool:
-    return any(t in RECENT_TOKENS for t in tokens)
-
-def _extract_details(tokens: List[str]) -> bool:
-    return any(t in DETAIL_TOKENS for t in tokens)
-
-def _extract_instructor_like(text: str) -> Optional[str]:
-    # crude heuristic: if user writes "details cs 580 yu" we’ll capture 'yu'
-    # Grab a trailing word that isn’t a known token/number/subject
-    tokens = _tokenize(text)
-    garbage = set().union(
-        RECENT_TOKENS, DETAIL_TOKENS,
-        set(POLARITY_MAP.keys()),
-        set().union(*KEYWORD_SYNONYMS.values()),
-        {s.lower() for s in SUBJECT_CODES}, {"level"}
-    )
-    tail = [t for t in tokens if not t.isdigit() and t not in garbage]
-    # If the last leftover token looks like a name fragment, return it
-    return tail[-1] if tail else None
-
-def parse(user_text: str) -> Dict:
-    tokens = _tokenize(user_text)
-    intent = Intent()
-    intent.polarity = _extract_polarity(tokens)
-    intent.subject = _extract_subject(tokens)
-    intent.class_num = _extract_class_num(tokens)
-    intent.level = _extract_level(tokens)
-    intent.keywords = _extract_keywords(tokens)
-    intent.recent = _extract_recent(tokens)
-    intent.details = _extract_details(tokens)
-    intent.explain = ("--explain" in user_text.lower()) or ("-explain" in user_text.lower())
+        if t.isdigit():
+            if intent.class_num is None:
+                intent.class_num = t
+            # "500 level"
+            if intent.level is None and i + 1 < len(tokens) and tokens[i + 1] == "level":
+                intent.level = int(t)
+            continue
+
+        lvl = _level_prefix(t)
+        if lvl is not None:
+            if intent.class_num is None:
+                intent.class_num = lvl
+            if intent.level is None:
+                intent.level = int(lvl)
+
+        if t not in _GARBAGE:
+            name_tail = t
+
+    intent.polarity = polarity or "easy"
+    intent.keywords = list(keywords)
+    intent.explain = "-explain" in text_lower  # also matches "--explain"
 
     # instructor_like only when user likely asked details or gave a trailing name
-    if intent.details or ("details" in tokens):
-        intent.instructor_like = _extract_instructor_like(user_text)
+    # crude heuristic: for "details cs 580 yu" we capture the trailing 'yu'
+    if intent.details:
+        intent.instructor_like = name_tail
 
-    return intent.to_dict()
+    d = intent.to_dict()
+    d["keywords"] = tuple(d["keywords"])
+    return MappingProxyType(d)
@@ -26,11 +26,18 @@ So the rest of the code (actions.py, main_cli.py) can work unchanged.
 from __future__ import annotations
 
 from dataclasses import dataclass, asdict
-from typing import Optional, List, Dict, Any
+from typing import TYPE_CHECKING, Optional, List, Dict, Any, Awaitable, Callable, Literal, Set, Tuple
+from pathlib import Path
+import asyncio
+import hashlib
 import json
 import os
 
-from openai import OpenAI
+from pydantic import BaseModel, Field
+
+if TYPE_CHECKING:
+    # imported lazily in _get_client: rule-only deployments never load openai
+    from openai import AsyncOpenAI
 
 # ---------------------------
 # 1) Intent dataclass (same shape as our rule-based parser)
@@ -58,185 +65,93 @@ class Intent:
 
 
 # ---------------------------
-# 2) System prompt + JSON schema
+# 2) System prompt + structured-output schema
 # ---------------------------
+# The mapping rules live in the field descriptions; the API enforces the
+# schema, so the prompt itself stays one line and no few-shot examples are sent.
 
-SYSTEM_PROMPT = """
-You are an intent parser for a course-selection assistant for UIC.
-
-You NEVER answer the question directly. Your ONLY job is to convert
-the user's text into a structured JSON intent object.
-
-JSON FIELDS (all keys must be present):
-
-- polarity: "easy" or "hard"
-    "easier", "chill", "lenient", "safe bet" → "easy"
-    "strict", "hard", "tough", "challenging" → "hard"
-    If unclear, default to "easy".
-
-- subject: subject code like "CS", "STAT", "ECE".
-    If the user mentions a subject (e.g., "cs", "stat"),
-    normalize to uppercase. If none, use null.
-
-- class_num: course number as a string, e.g. "580", "418".
-    If user doesn't specify exactly, use null.
-
-- keywords: list of lowercase tags from:
-    ["ml", "data", "nlp", "ai", "bio", "stats", "systems", "theory"]
-    Map user language to these:
-        - "machine learning", "ml", "deep learning" → "ml"
-        - "data", "data science", "database", "big data" → "data"
-        - "nlp", "language", "text" → "nlp"
-        - "ai", "artificial intelligence" → "ai"
-        - "bio", "biomed", "biomedical", "medical" → "bio"
-        - "stats", "statistics", "probability" → "stats"
-        - "systems", "os", "operating systems", "networks" → "systems"
-        - "theory", "algorithms", "complexity" → "theory"
-    If nothing fits, use [].
-
-- recent: boolean.
-    true if the user mentions "recent", "last few years",
-    "modern", "current profs", or a recent range. Otherwise false.
-
-- level: integer or null.
-    If the user says "500-level", use 500.
-    If "400-level", use 400.
-    If they give an explicit course number like 580,
-       you may leave level null (class_num will carry it).
-    If not specified, use null.
-
-- instructor_like: partial instructor name as lowercase string,
-    e.g. "yu" or "sintos".
-    If the user mentions a prof name, set this to a short substring.
-    Otherwise null.
-
-- explain: boolean.
-    true if the user asks "why", "explain", "show reasoning",
-    "--explain", etc. Otherwise false.
-
-- details: boolean.
-    true if the user asks for semester-by-semester detail,
-    history, trend, "show all semesters", or "--details".
-    Otherwise false.
-
-You MUST output ONLY a JSON object, no extra text, no markdown,
-no explanations.
-"""
+Keyword = Literal["ml", "data", "nlp", "ai", "bio", "stats", "systems", "theory"]
 
-# ---------------------------
-# 3) Prompt builder
-# ---------------------------
 
+class IntentModel(BaseModel):
+    polarity: Literal["easy", "hard"] = Field(
+        description='"easy" for easier/chill/lenient/safe bet, "hard" for strict/tough/challenging; "easy" if unclear.'
+    )
+    subject: Optional[str] = Field(
+        description='Uppercase subject code such as "CS", "STAT", "ECE"; null if none.'
+    )
+    class_num: Optional[str] = Field(
+        description='Exact course number such as "580"; null if not given exactly.'
+    )
+    keywords: List[Keyword] = Field(
+        description=(
+            "Topic tags: machine/deep learning->ml; data science, database, big data->data; "
+            "language, text->nlp; artificial intelligence->ai; biomed, medical->bio; "
+            "statistics, probability->stats; os, operating systems, networks->systems; "
+            "algorithms, complexity->theory. Empty if nothing fits."
+        )
+    )
+    recent: bool = Field(
+        description='True for "recent", "last few years", "modern", "current profs".'
+    )
+    level: Optional[int] = Field(
+        description='500 for "500-level", 400 for "400-level"; null otherwise (also when class_num is given).'
+    )
+    instructor_like: Optional[str] = Field(
+        description='Short lowercase fragment of a named professor, e.g. "yu"; null if none.'
+    )
+    explain: bool = Field(
+        description='True if the user asks why / explain / show reasoning / "--explain".'
+    )
+    details: bool = Field(
+        description='True for semester-by-semester detail, history, trend, "--details".'
+    )
 
-def build_prompt(user_text: str) -> str:
-    """
-    Build the user-facing part of the prompt.
-    The system message explains the schema; this adds examples and the actual text.
-    """
-    examples = [
-        {
-            "user": "easy cs 580 recent",
-            "intent": {
-                "polarity": "easy",
-                "subject": "CS",
-                "class_num": "580",
-                "keywords": [],
-                "recent": True,
-                "level": None,
-                "instructor_like": None,
-                "explain": False,
-                "details": False,
-            },
-        },
-        {
-            "user": "hard 500-level ml classes",
-            "intent": {
-                "polarity": "hard",
-                "subject": None,
-                "class_num": None,
-                "keywords": ["ml"],
-                "recent": False,
-                "level": 500,
-                "instructor_like": None,
-                "explain": False,
-                "details": False,
-            },
-        },
-        {
-            "user": "show easy data cs courses --explain",
-            "intent": {
-                "polarity": "easy",
-                "subject": "CS",
-                "class_num": None,
-                "keywords": ["data"],
-                "recent": False,
-                "level": None,
-                "instructor_like": None,
-                "explain": True,
-                "details": False,
-            },
-        },
-        {
-            "user": "details for cs 580 yu",
-            "intent": {
-                "polarity": "easy",
-                "subject": "CS",
-                "class_num": "580",
-                "keywords": [],
-                "recent": False,
-                "level": None,
-                "instructor_like": "yu",
-                "explain": False,
-                "details": True,
-            },
-        },
-    ]
 
-    examples_text = "\n\n".join(
-        [
-            f"User: {ex['user']}\nIntent JSON: {json.dumps(ex['intent'])}"
-            for ex in examples
-        ]
+class IntentBatchModel(BaseModel):
+    intents: List[IntentModel] = Field(
+        description="One intent per query, in the order the queries were given."
     )
 
-    return f"""
-Here are examples of how to map natural language to intent JSON:
-
-{examples_text}
 
-Now parse this new user query into an intent JSON:
+SYSTEM_PROMPT = "Parse the UIC course-search query into the intent schema. Never answer it."
 
-User: {user_text}
-Intent JSON:
-""".strip()
+BATCH_SYSTEM_PROMPT = (
+    "Parse each UIC course-search query (numbered, separated by ---) "
+    "into the intent schema, one intent per query, in order. Never answer them."
+)
 
 
 # ---------------------------
-# 4) Helpers: client + JSON extraction + normalization
+# 3) Helpers: client, normalization, disk cache
 # ---------------------------
 
 
-def _get_client() -> OpenAI:
+_CLIENT: Optional[AsyncOpenAI] = None
+_CLIENT_LOOP: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_client() -> AsyncOpenAI:
     """
-    Create an OpenAI client.
+    Return the shared async OpenAI client, so every call reuses the same
+    HTTP connection pool. Its connections belong to one event loop, so a
+    new client is made if we're called from a different loop.
     Requires OPENAI_API_KEY in the environment.
     """
-    # If OPENAI_API_KEY is not set, OpenAI() will raise an error when used.
-    return OpenAI()
+    global _CLIENT, _CLIENT_LOOP
+    from openai import AsyncOpenAI
 
+    loop = asyncio.get_running_loop()
+    # If OPENAI_API_KEY is not set, AsyncOpenAI() will raise an error when used.
+    if _CLIENT is None or _CLIENT_LOOP is not loop:
+        _CLIENT = AsyncOpenAI()
+        _CLIENT_LOOP = loop
+    return _CLIENT
 
-def _extract_json(text: str) -> str:
-    """
-    Be defensive: sometimes models wrap JSON with text.
-    We take the substring between the first '{' and the last '}'.
-    """
-    if not text:
-        return "{}"
-    start = text.find("{")
-    end = text.rfind("}")
-    if start == -1 or end == -1 or end <= start:
-        return "{}"
-    return text[start : end + 1]
+
+def _parsed(resp) -> Optional[BaseModel]:
+    # None when the model refused or the output was cut off
+    return resp.choices[0].message.parsed
 
 
 def _normalize_intent_dict(data: Dict[str, Any], original_text: str) -> Intent:
@@ -312,44 +227,239 @@ def _normalize_intent_dict(data: Dict[str, Any], original_text: str) -> Intent:
     )
 
 
+# Parsed intents are persisted on disk so identical questions (demo prompts,
+# page reloads) skip the LLM even across restarts. The key covers everything
+# that shapes the answer: prompt, schema, model and the user's text.
+# Set LLM_CACHE_DIR="" to disable.
+LLM_CACHE_DIR = os.getenv(
+    "LLM_CACHE_DIR", str(Path(__file__).resolve().parents[1] / ".cache" / "llm_intents")
+)
+LLM_CACHE_MAX_FILES = 10_000
+_LLM_CACHE_SWEEP_EVERY = 256
+_cache_writes = 0
+_SCHEMA_FINGERPRINT = json.dumps(IntentModel.model_json_schema(), sort_keys=True)
+
+
+def _cache_path(user_text: str, model: str) -> Optional[Path]:
+    if not LLM_CACHE_DIR:
+        return None
+    key = hashlib.sha256(
+        "\0".join([SYSTEM_PROMPT, _SCHEMA_FINGERPRINT, model, user_text]).encode("utf-8")
+    ).hexdigest()
+    return Path(LLM_CACHE_DIR) / key[:2] / key
+
+
+def _cache_read(path: Optional[Path]) -> Optional[Dict[str, Any]]:
+    if path is None:
+        return None
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        os.utime(path)  # mark as recently used for the LRU sweep
+    except (OSError, ValueError):
+        return None
+    return data
+
+
+def _cache_write(path: Optional[Path], intent: Dict[str, Any]) -> None:
+    global _cache_writes
+    if path is None:
+        return
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(json.dumps(intent), encoding="utf-8")
+        os.replace(tmp, path)  # atomic: readers never see a partial file
+    except OSError:
+        return
+    _cache_writes += 1
+    if _cache_writes % _LLM_CACHE_SWEEP_EVERY == 0:
+        _cache_sweep()
+
+
+def _cache_sweep() -> None:
+    """
+    Keep at most LLM_CACHE_MAX_FILES entries, dropping least recently used.
+    """
+    try:
+        files = [(f.stat().st_mtime, f) for f in Path(LLM_CACHE_DIR).glob("*/*") if f.is_file()]
+    except OSError:
+        return
+    excess = len(files) - LLM_CACHE_MAX_FILES
+    if excess <= 0:
+        return
+    files.sort()
+    for _, f in files[:excess]:
+        f.unlink(missing_ok=True)
+
+
 # ---------------------------
-# 5) Main entry: parse_with_llm()
+# 4) Main entry: parse_with_llm()
 # ---------------------------
 
 
-def parse_with_llm(
+async def parse_with_llm(
     user_text: str,
     model: str = "gpt-4.1-mini",
 ) -> Dict[str, Any]:
     """
     Call the LLM and return an intent dict matching chatbot.intent.parse().
 
-    Usage example (later):
+    Usage example:
 
         from chatbot.llm_intent import parse_with_llm
-        intent = parse_with_llm("easy data cs recent --explain")
+        intent = await parse_with_llm("easy data cs recent --explain")
         results = rank_professors(intent)
 
+    Answers are cached on disk (see LLM_CACHE_DIR).
     """
+    path = _cache_path(user_text, model)
+    cached = _cache_read(path)
+    if cached is not None:
+        return cached
+
+    intent = await _call_llm(user_text, model)
+    _cache_write(path, intent)
+    return intent
+
+
+async def _call_llm(user_text: str, model: str) -> Dict[str, Any]:
     client = _get_client()
-    prompt = build_prompt(user_text)
 
-    resp = client.chat.completions.create(
+    resp = await client.chat.completions.parse(
         model=model,
         temperature=0.0,
+        response_format=IntentModel,
         messages=[
             {"role": "system", "content": SYSTEM_PROMPT},
-            {"role": "user", "content": prompt},
+            {"role": "user", "content": user_text},
         ],
     )
 
-    content = resp.choices[0].message.content or ""
-    json_str = _extract_json(content)
-
-    try:
-        raw = json.loads(json_str)
-    except Exception:
-        raw = {}
+    parsed = _parsed(resp)
+    raw = parsed.model_dump() if parsed is not None else {}
 
     intent_obj = _normalize_intent_dict(raw, original_text=user_text)
     return intent_obj.to_dict()
+
+
+# ---------------------------
+# 5) Batched parsing: several queries, one completion
+# ---------------------------
+
+
+async def parse_many_with_llm(
+    user_texts: List[str],
+    model: str = "gpt-4.1-mini",
+) -> List[Dict[str, Any]]:
+    """
+    Parse several queries with ONE chat completion (amortizes the request
+    overhead across a batch). Queries already in the disk cache are answered
+    from it; only the misses go to the model.
+    """
+    paths = [_cache_path(t, model) for t in user_texts]
+    results = [_cache_read(p) for p in paths]
+    misses = [i for i, r in enumerate(results) if r is None]
+    if misses:
+        fresh = await _call_llm_many([user_texts[i] for i in misses], model)
+        for i, intent in zip(misses, fresh):
+            results[i] = intent
+            _cache_write(paths[i], intent)
+    return results
+
+
+async def _call_llm_many(user_texts: List[str], model: str) -> List[Dict[str, Any]]:
+    # falls back to one call per query when the batch has a single item or
+    # the model's answer can't be split cleanly
+    if len(user_texts) == 1:
+        return [await _call_llm(user_texts[0], model)]
+
+    client = _get_client()
+    queries = "\n---\n".join(f"[{i}] {t}" for i, t in enumerate(user_texts))
+    resp = await client.chat.completions.parse(
+        model=model,
+        temperature=0.0,
+        response_format=IntentBatchModel,
+        messages=[
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": queries},
+        ],
+    )
+
+    parsed = _parsed(resp)
+    if parsed is None or len(parsed.intents) != len(user_texts):
+        return list(await asyncio.gather(*(_call_llm(t, model) for t in user_texts)))
+
+    return [
+        _normalize_intent_dict(intent.model_dump(), original_text=text).to_dict()
+        for intent, text in zip(parsed.intents, user_texts)
+    ]
+
+
+class DynBatcher:
+    """
+    Collect concurrent requests into batches for an async batch function.
+
+    A batch is flushed when it reaches `max_batch_size` items or when the
+    oldest waiting item has waited `max_delay` seconds. Each flush runs as
+    its own task, so collection of the next batch continues meanwhile.
+
+        batcher = DynBatcher(parse_many_with_llm)
+        intent = await batcher.process_batched("easy cs 580")
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Awaitable[List[Any]]],
+        max_batch_size: int = 8,
+        max_delay: float = 0.08,
+    ):
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # the loop only keeps weak references to tasks: hold them until done
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def process_batched(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # first use (or a new event loop, e.g. in tests): start a collector
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._spawn(self._collect(self._queue))
+        fut = loop.create_future()
+        await self._queue.put((item, fut))
+        return await fut
+
+    async def _collect(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self._spawn(self._flush(batch))
+
+    async def _flush(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await self.batch_fn([item for item, _ in batch])
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), result in zip(batch, results):
+            if not fut.done():
+                fut.set_result(result)
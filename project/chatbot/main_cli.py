@@ -1,16 +1,60 @@
-from rich.console import Console
+from rich.console import Console, Group
 from rich.prompt import Prompt
 from rich.table import Table
+from rich.text import Text
+from functools import lru_cache
+from operator import itemgetter
+import asyncio
 import logging
 import os
+import sys
+import threading
 
 from chatbot.intent import parse
 from chatbot.llm_intent import parse_with_llm
-from chatbot.actions import rank_professors, details_section
+from chatbot.actions import rank_professors, details_section, warm_up
 
 console = Console()
 log = logging.getLogger("chatbot.cli")
 
+# One event loop for the whole session, so the async LLM client (and its
+# connection pool) is reused from one turn to the next.
+_runner = None
+
+
+def _run_async(coro):
+    global _runner
+    if _runner is None:
+        _runner = asyncio.Runner()
+    return _runner.run(coro)
+
+
+# Rows are dicts from actions._run; one itemgetter call per row pulls every
+# field the tables need as a tuple, instead of a lookup per cell.
+_ROW_FIELDS = itemgetter(
+    "subject", "class_num", "class_title", "instructor", "semester", "A_rate", "DFW_rate", "total_students"
+)
+
+
+# UICOURSE_PLAIN=1: print result tables as plain fixed-width text with a
+# single write, skipping Rich layout (handy for piping and scripted runs)
+PLAIN_OUTPUT = os.getenv("UICOURSE_PLAIN") == "1"
+
+
+def _write_plain(header: str, columns, cells, footer: str = ""):
+    cells = [[str(x or "") for x in c] for c in cells]  # rows may hold NULLs
+    widths = [max(len(col), *(len(c[i]) for c in cells)) for i, col in enumerate(columns)]
+
+    def line(values):
+        return "  ".join(v.ljust(w) for v, w in zip(values, widths)).rstrip()
+
+    out = [header, line(columns), line("-" * w for w in widths)]
+    out.extend(line(c) for c in cells)
+    if footer:
+        out.append(footer)
+    sys.stdout.write("\n".join(out) + "\n")
+    sys.stdout.flush()
+
 
 def _print_rankings(rows, polarity: str, explain: bool, params):
     if not rows:
@@ -26,33 +70,33 @@ def _print_rankings(rows, polarity: str, explain: bool, params):
         if polarity == "easy"
         else "💪 Strict/Harder picks (higher D/F/W, lower A%):"
     )
-    console.print(header)
+
+    columns = ["Course", "Instructor", "Sem", "A%", "DFW%", "Students"]
+    cells = [
+        (f"{subj} {cnum} — {title}", inst, sem or "", f"{a:.1f}", f"{dfw:.1f}", str(tot))
+        for subj, cnum, title, inst, sem, a, dfw, tot in map(_ROW_FIELDS, rows)
+    ]
+    why = (
+        f"Why these? Sorted by "
+        f"{'A% desc, DFW% asc' if polarity == 'easy' else 'DFW% desc, A% asc'}, "
+        f"then enrollment and recency. Filters: {params}"
+    ) if explain else ""
+
+    if PLAIN_OUTPUT:
+        _write_plain(header, columns, cells, why)
+        return
 
     tbl = Table(show_header=True, header_style="bold")
-    tbl.add_column("Course")
-    tbl.add_column("Instructor")
-    tbl.add_column("Sem")
-    tbl.add_column("A%")
-    tbl.add_column("DFW%")
-    tbl.add_column("Students")
-
-    for r in rows:
-        tbl.add_row(
-            f"{r['subject']} {r['class_num']} — {r['class_title']}",
-            r["instructor"],
-            r.get("semester") or "",
-            f"{r['A_rate']:.1f}",
-            f"{r['DFW_rate']:.1f}",
-            str(r["total_students"]),
-        )
-    console.print(tbl)
+    for col in columns:
+        tbl.add_column(col)
+    for c in cells:
+        tbl.add_row(*c)
 
-    if explain:
-        console.print(
-            f"[dim]Why these? Sorted by "
-            f"{'A% desc, DFW% asc' if polarity == 'easy' else 'DFW% desc, A% asc'}, "
-            f"then enrollment and recency. Filters: {params}[/dim]"
-        )
+    # one print: Rich lays out header, table and explanation in a single pass
+    parts = [header, tbl]
+    if why:
+        parts.append(Text(why, style="dim"))
+    console.print(Group(*parts))
 
 
 def _print_details(rows):
@@ -60,20 +104,50 @@ def _print_details(rows):
         console.print("[yellow]No matching sections for details.[/yellow]")
         return
 
-    console.print("🔎 Semester-by-semester (most recent first):")
+    header = "🔎 Semester-by-semester (most recent first):"
+    columns = ["Semester", "Course", "Instructor", "A%", "DFW%", "Students"]
+    cells = [
+        (sem, f"{subj} {cnum} — {title}", inst, f"{a:.1f}", f"{dfw:.1f}", str(tot))
+        for subj, cnum, title, inst, sem, a, dfw, tot in map(_ROW_FIELDS, rows)
+    ]
+
+    if PLAIN_OUTPUT:
+        _write_plain(header, columns, cells)
+        return
+
     tbl = Table(show_header=True, header_style="bold")
-    for col in ["Semester", "Course", "Instructor", "A%", "DFW%", "Students"]:
+    for col in columns:
         tbl.add_column(col)
-    for r in rows:
-        tbl.add_row(
-            r["semester"],
-            f"{r['subject']} {r['class_num']} — {r['class_title']}",
-            r["instructor"],
-            f"{r['A_rate']:.1f}",
-            f"{r['DFW_rate']:.1f}",
-            str(r["total_students"]),
-        )
-    console.print(tbl)
+    for c in cells:
+        tbl.add_row(*c)
+    console.print(Group(header, tbl))
+
+
+# Repeated questions are common in a session: remember LLM intents and the
+# rows for each intent. Failed LLM calls raise, so they are never cached.
+@lru_cache(maxsize=256)
+def _llm_intent(norm_text: str):
+    console.print("[dim]🔮 Using LLM intent parser...[/dim]")
+    return _run_async(parse_with_llm(norm_text))
+
+
+@lru_cache(maxsize=128)
+def _query_rows(intent_key: tuple):
+    params = {k: list(v) if k == "keywords" else v for k, v in intent_key}
+    if params.get("details"):
+        # e.g., "details cs 580 yu"
+        subj = params.get("subject")
+        cnum = params.get("class_num")
+        inst = params.get("instructor_like") or ""
+        return details_section(subj or "", cnum or "", inst)
+    return rank_professors(params, top_n=5)
+
+
+def _intent_key(params) -> tuple:
+    # hashable form of an intent dict (keywords is the only list field)
+    return tuple(sorted(
+        (k, tuple(v) if k == "keywords" else v) for k, v in params.items()
+    ))
 
 
 def get_intent(text: str):
@@ -82,33 +156,29 @@ def get_intent(text: str):
     Toggle with environment variable: USE_LLM_INTENT=1
     """
     use_llm = os.getenv("USE_LLM_INTENT") == "1"
+    # both parsers ignore case and extra whitespace, so normalize the cache key;
+    # hand out copies so callers can't alter a cached intent (parse() caches too)
+    norm = " ".join(text.lower().split())
 
     if use_llm:
-        console.print("[dim]🔮 Using LLM intent parser...[/dim]")
         try:
-            return parse_with_llm(text)
+            return dict(_llm_intent(norm))
         except Exception as e:
             console.print(
                 f"[yellow]⚠️ LLM parser failed, falling back to rule parser: {e}[/yellow]"
             )
-            return parse(text)
-    else:
-        return parse(text)
+    intent = parse(norm)
+    return {**intent, "keywords": list(intent["keywords"])}
 
 
 def handle_text(text: str):
     params = get_intent(text)
+    rows = _query_rows(_intent_key(params))
 
     if params.get("details"):
-        # e.g., "details cs 580 yu"
-        subj = params.get("subject")
-        cnum = params.get("class_num")
-        inst = params.get("instructor_like") or ""
-        rows = details_section(subj or "", cnum or "", inst)
         _print_details(rows)
         return
 
-    rows = rank_professors(params, top_n=5)
     _print_rankings(
         rows,
         params.get("polarity", "easy"),
@@ -117,7 +187,22 @@ def handle_text(text: str):
     )
 
 
+def _prewarm():
+    """
+    Cold-start work done in the background while the user types: open the
+    DuckDB connection (attaching, or first building, the native warehouse)
+    and, in LLM mode, import the OpenAI SDK.
+    """
+    try:
+        warm_up()
+        if os.getenv("USE_LLM_INTENT") == "1":
+            import openai  # noqa: F401
+    except Exception as e:
+        log.debug("prewarm failed: %r", e)
+
+
 def main():
+    threading.Thread(target=_prewarm, daemon=True).start()
     console.print("[bold]UICourseAI Chatbot — MVP[/bold]")
     console.print(
         "Type queries like: 'easy cs 580', 'hard cs 580', 'show easy ml courses', "
@@ -138,12 +223,17 @@ def main():
                 "  • details cs 580 yu\n"
                 "Flags:\n"
                 "  • --explain  (prints why a result ranked)\n\n"
+                "Output:\n"
+                "  • Set UICOURSE_PLAIN=1 for plain-text tables instead of Rich.\n\n"
                 "LLM mode:\n"
                 "  • Set USE_LLM_INTENT=1 in your environment to use the AI intent parser."
             )
             continue
         handle_text(user)
 
+    if _runner is not None:
+        _runner.close()
+
 
 if __name__ == "__main__":
     main()
@@ -5,20 +5,40 @@ from typing import Dict, List, Optional
 EASY_WORDS = {"easy", "easiest", "lenient", "chill", "good"}
 HARD_WORDS = {"hard", "strict", "tough", "difficult"}
 
+# substring matches, one scan per word set
+EASY_PATTERN = re.compile("|".join(sorted(EASY_WORDS)))
+HARD_PATTERN = re.compile("|".join(sorted(HARD_WORDS)))
+
 SUBJECT_PATTERN = re.compile(r"\b([A-Z]{2,5})\b")
 CLASSNUM_PATTERN = re.compile(r"\b(\d{3,4})\b")
+COURSE_PATTERN = re.compile(r"\b([A-Z]{2,5})\s*-?\s*(\d{3,4})\b", re.I)  # "cs 580", "cs580", "CS-580"
+
+# a query made only of these words needs no regex work (see fast path)
+TRIVIAL_WORDS = frozenset(EASY_WORDS | HARD_WORDS | {"ml"})
 
 def parse_user_text(text: str) -> Dict:
     t = text.lower().strip()
 
+    toks = t.split()
+    if len(toks) <= 2 and TRIVIAL_WORDS.issuperset(toks):
+        # same answer the full path gives: any 2-5 letter word is taken as
+        # the subject, and nothing else can match
+        return {
+            "intent": "rank_professors",
+            "polarity": "hard" if HARD_WORDS.intersection(toks) else "easy",
+            "subject": next((w.upper() for w in toks if len(w) <= 5), None),
+            "class_num": None,
+            "keywords": ["ml"] if "ml" in toks else [],
+        }
+
     # intent: for MVP everything is a ranking request
     intent = "rank_professors"
 
     # polarity: easy vs hard (default to easy if none)
     polarity = "easy"
-    if any(w in t for w in HARD_WORDS):
+    if HARD_PATTERN.search(t):
         polarity = "hard"
-    elif any(w in t for w in EASY_WORDS):
+    elif EASY_PATTERN.search(t):
         polarity = "easy"
 
     # subject and class number extraction (e.g., "cs 580")
@@ -26,7 +46,7 @@ def parse_user_text(text: str) -> Dict:
     class_num: Optional[str] = None
 
     # try to find patterns like "cs 580" or "cs580"
-    compact = re.findall(r"\b([A-Z]{2,5})\s*-?\s*(\d{3,4})\b", text, flags=re.I)
+    compact = COURSE_PATTERN.findall(text)
     if compact:
         subject = compact[0][0].upper()
         class_num = compact[0][1]
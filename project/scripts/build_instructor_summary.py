@@ -1,5 +1,5 @@
 import os
-import pandas as pd
+import duckdb
 
 WAREHOUSE_PATH = os.path.join("data", "warehouse", "grades_master.parquet")
 OUT_DIR = os.path.join("data", "analytics")
@@ -11,59 +11,62 @@ def main():
         print(f"⚠️ Not found: {WAREHOUSE_PATH}")
         return
 
-    df = pd.read_parquet(WAREHOUSE_PATH)
-    if df.empty:
-        print("⚠️ Warehouse is empty.")
-        return
-
-    # Expect these columns from your API/warehouse step:
-    # subject, class_num, instructor, semester, total_students, A,B,C,D,F,withdrawn
-    needed = ["subject","class_num","instructor","semester",
-              "total_students","A","B","C","D","F","withdrawn"]
-    missing = [c for c in needed if c not in df.columns]
-    if missing:
-        print(f"⚠️ Missing columns in warehouse: {missing}")
-        return
-
-    # Percent columns per section
-    grade_cols = ["A","B","C","D","F","withdrawn"]
-    for c in grade_cols:
-        df[f"{c}_pct"] = (df[c] / df["total_students"]).replace([pd.NA, pd.NaT], 0) * 100
-
-    # Aggregate per instructor+course
-    agg = (
-        df.groupby(["subject","class_num","instructor"], dropna=False)
-          .agg(
-              terms_taught=("semester","nunique"),
-              sections=("semester","count"),
-              students=("total_students","sum"),
-              A_pct_avg=("A_pct","mean"),
-              B_pct_avg=("B_pct","mean"),
-              C_pct_avg=("C_pct","mean"),
-              D_pct_avg=("D_pct","mean"),
-              F_pct_avg=("F_pct","mean"),
-              W_pct_avg=("withdrawn_pct","mean"),
-              most_recent_term=("semester","max"),
-          )
-          .reset_index()
-    )
+    with duckdb.connect() as con:
+        src = f"read_parquet('{WAREHOUSE_PATH}')"
 
-    # Simple difficulty proxy (higher → harder)
-    agg["Difficulty_Index"] = 100 - (agg["A_pct_avg"] + agg["B_pct_avg"])
+        # Expect these columns from your API/warehouse step:
+        # subject, class_num, instructor, semester, total_students, A,B,C,D,F,withdrawn
+        needed = ["subject","class_num","instructor","semester",
+                  "total_students","A","B","C","D","F","withdrawn"]
+        have = {row[0] for row in con.execute(f"DESCRIBE SELECT * FROM {src}").fetchall()}
+        missing = [c for c in needed if c not in have]
+        if missing:
+            print(f"⚠️ Missing columns in warehouse: {missing}")
+            return
 
-    # Sort for convenience
-    agg = agg.sort_values(["subject","class_num","Difficulty_Index"])
+        # Aggregate per instructor+course in one scan: per-section percentages
+        # are computed inside the AVGs, so no per-row percent columns are
+        # materialized. Zero-enrollment sections divide by NULLIF(...) = NULL,
+        # which AVG skips like pandas' mean() skips NaN (a plain 0/0 would be a
+        # NaN in DuckDB and turn the whole group's average into NaN). The result is
+        # O(groups) and is written out by DuckDB directly, never through pandas.
+        con.execute(f"""
+            CREATE TEMP TABLE summary AS
+            SELECT
+                subject, class_num, instructor,
+                COUNT(DISTINCT semester)                       AS terms_taught,
+                COUNT(semester)                                AS sections,
+                CAST(SUM(total_students) AS BIGINT)            AS students,
+                AVG(A * 100.0 / NULLIF(total_students, 0))           AS A_pct_avg,
+                AVG(B * 100.0 / NULLIF(total_students, 0))           AS B_pct_avg,
+                AVG(C * 100.0 / NULLIF(total_students, 0))           AS C_pct_avg,
+                AVG(D * 100.0 / NULLIF(total_students, 0))           AS D_pct_avg,
+                AVG(F * 100.0 / NULLIF(total_students, 0))           AS F_pct_avg,
+                AVG(withdrawn * 100.0 / NULLIF(total_students, 0))   AS W_pct_avg,
+                MAX(semester)                                  AS most_recent_term,
+                -- Simple difficulty proxy (higher → harder)
+                100 - (A_pct_avg + B_pct_avg)                  AS Difficulty_Index
+            FROM {src}
+            GROUP BY subject, class_num, instructor
+            -- Sort for convenience
+            ORDER BY subject, class_num, Difficulty_Index, instructor
+        """)
+        n_rows = con.execute("SELECT COUNT(*) FROM summary").fetchone()[0]
+        if n_rows == 0:
+            print("⚠️ Warehouse is empty.")
+            return
 
-    os.makedirs(OUT_DIR, exist_ok=True)
-    agg.to_parquet(OUT_PARQUET, index=False)
-    agg.to_csv(OUT_CSV, index=False)
+        os.makedirs(OUT_DIR, exist_ok=True)
+        con.execute(f"COPY summary TO '{OUT_PARQUET}' (FORMAT PARQUET)")
+        con.execute(f"COPY summary TO '{OUT_CSV}' (HEADER, DELIMITER ',')")
 
-    # Small verification printout
-    print(f"✅ Wrote {len(agg)} instructor rows → {OUT_PARQUET}")
-    print("🔎 Preview:")
-    preview_cols = ["subject","class_num","instructor","terms_taught",
-                    "students","A_pct_avg","B_pct_avg","Difficulty_Index","most_recent_term"]
-    print(agg[preview_cols].head(10).to_string(index=False, float_format=lambda x: f'{x:.1f}'))
+        # Small verification printout
+        print(f"✅ Wrote {n_rows} instructor rows → {OUT_PARQUET}")
+        print("🔎 Preview:")
+        preview_cols = ["subject","class_num","instructor","terms_taught",
+                        "students","A_pct_avg","B_pct_avg","Difficulty_Index","most_recent_term"]
+        preview = con.execute(f"SELECT {', '.join(preview_cols)} FROM summary LIMIT 10").df()
+    print(preview.to_string(index=False, float_format=lambda x: f'{x:.1f}'))
 
 if __name__ == "__main__":
     main()
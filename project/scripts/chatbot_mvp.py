@@ -1,6 +1,8 @@
 import re
 import sys
+import threading
 from pathlib import Path
+import duckdb
 import pandas as pd
 
 WAREHOUSE_PATH = Path("data/warehouse/grades_master.parquet")
@@ -11,13 +13,36 @@ ML_KEYWORDS = [
     "data science", "ai", "artificial intelligence", "pattern recognition",
     "statistical learning", "analytics"
 ]
+# columns the chatbot uses; nothing else is decoded from the parquet file
+WAREHOUSE_COLUMNS = [
+    "subject", "class_num", "class_title", "instructor", "semester",
+    "A", "B", "C", "D", "F", "withdrawn", "total_students",
+]
+
 RECENT_TERM_REGEX = re.compile(r"^(FA|SP|SU)\d{2}$", re.I)  # e.g., FA23
 
+# query patterns, compiled once
+_SUBJECT_EQ_RE = re.compile(r"\bsubject\s*=\s*([A-Za-z]{2,4})\b")
+_WORD_RE = re.compile(r"\b([A-Za-z]{2,4})\b")
+_SUBJECT_HINT_RE = re.compile(r"\b(?:in|for)\s+([A-Za-z]{2,4})\b")
+_CLASSNUM_RE = re.compile(r"\b(\d{3})\b")
+_TERM_RE = re.compile(r"\b(FA|SP|SU)\d{2}\b", re.I)
+_TOP_RE = re.compile(r"\btop\s+(\d{1,2})\b")
+# substring checks on the lowercased query: one C-level scan per category
+# instead of an any() generator over each word list
+EASY_WORDS = ["easy", "lenient", "high a", "grade friendly"]
+HARD_WORDS = ["hard", "strict"]
+_ML_HINT_RE = re.compile("|".join(map(re.escape, ML_KEYWORDS)))
+_EASY_HINT_RE = re.compile("|".join(map(re.escape, EASY_WORDS)))
+_HARD_HINT_RE = re.compile("|".join(map(re.escape, HARD_WORDS)))
+# any ML keyword as a whole word, in one pass over a title
+_ML_RE = re.compile(r"\b(?:" + "|".join(map(re.escape, ML_KEYWORDS)) + r")\b", re.I)
+
 def load_warehouse(path: Path) -> pd.DataFrame:
     if not path.exists():
         print(f"⚠️ Warehouse not found at {path}. Run the merge step first.")
         sys.exit(1)
-    df = pd.read_parquet(path)
+    df = pd.read_parquet(path, columns=WAREHOUSE_COLUMNS)
     # normalize
     for c in ["subject", "class_title", "instructor", "semester"]:
         if c in df.columns:
@@ -26,45 +51,59 @@ def load_warehouse(path: Path) -> pd.DataFrame:
         df["total_students"] = pd.to_numeric(df["total_students"], errors="coerce").fillna(0).astype(int)
     # guard: keep sensible rows
     df = df[df.get("total_students", 0) > 0].copy()
+    # the filter keys are normalized once here, so filter_df compares them
+    # as-is; category codes also make those comparisons integer compares
+    df["subject"] = df["subject"].str.upper().astype("category")
+    df["class_num"] = df["class_num"].fillna("").astype(str).str.strip().astype("category")
+    df["semester"] = df["semester"].str.upper().astype("category")
+    # titles / instructors repeat across terms: as categories, the ML title
+    # regex runs once per distinct title and rank_instructors' GROUP BY
+    # receives dictionary-encoded keys
+    df["class_title"] = df["class_title"].astype("category")
+    df["instructor"] = df["instructor"].astype("category")
     return df
 
-def add_rate_columns(df: pd.DataFrame) -> pd.DataFrame:
-    # compute per-row rates
-    for col in ["A","B","C","D","F","withdrawn"]:
-        if col not in df.columns:
-            df[col] = 0
-    denom = df["total_students"].replace(0, pd.NA)
-    for g in ["A","B","C","D","F","withdrawn"]:
-        df[f"{g}_rate"] = (df[g] / denom * 100).astype(float)
-    df["DFW_rate"] = df[["D_rate","F_rate","withdrawn_rate"]].sum(axis=1)  # crude “difficulty”
-    return df
+# queries made only of these words ("easy", "strict ml") skip the regexes
+_TRIVIAL_WORDS = frozenset({"easy", "hard", "strict", "lenient", "ml"})
 
 def parse_query(q: str):
     ql = q.lower()
 
-    want_ml = any(k in ql for k in ML_KEYWORDS)
-    want_easy = any(k in ql for k in ["easy", "lenient", "high a", "grade friendly"])
-    want_hard = "hard" in ql or "strict" in ql
+    toks = ql.split()
+    if len(toks) <= 2 and _TRIVIAL_WORDS.issuperset(toks):
+        return dict(
+            want_ml="ml" in toks,
+            want_easy="easy" in toks or "lenient" in toks,
+            want_hard="hard" in toks or "strict" in toks,
+            subject=None,
+            class_num=None,
+            term=None,
+            topk=10,
+        )
+
+    want_ml = _ML_HINT_RE.search(ql) is not None
+    want_easy = _EASY_HINT_RE.search(ql) is not None
+    want_hard = _HARD_HINT_RE.search(ql) is not None
 
     # subject filter like "subject=CS" or "CS only"
-    m_sub = re.search(r"\bsubject\s*=\s*([A-Za-z]{2,4})\b", q)
+    m_sub = _SUBJECT_EQ_RE.search(q)
     subject = m_sub.group(1).upper() if m_sub else None
     if not subject:
-        m_cs = re.search(r"\b([A-Za-z]{2,4})\b", q)
+        m_cs = _WORD_RE.search(q)
         # only accept as subject if explicitly hinted like "in CS" or "for CS"
-        if m_cs and re.search(rf"\b(in|for)\s+{m_cs.group(1)}\b", ql):
+        if m_cs and m_cs.group(1) in _SUBJECT_HINT_RE.findall(ql):
             subject = m_cs.group(1).upper()
 
     # course number if present (“580”, “CS 580”)
-    m_num = re.search(r"\b(\d{3})\b", q)
+    m_num = _CLASSNUM_RE.search(q)
     class_num = m_num.group(1) if m_num else None
 
     # term filter (optional), e.g., “FA23”, “SP24”
-    m_term = re.search(r"\b(FA|SP|SU)\d{2}\b", q, flags=re.I)
+    m_term = _TERM_RE.search(q)
     term = m_term.group(0).upper() if m_term else None
 
     topk = 10
-    m_top = re.search(r"\btop\s+(\d{1,2})\b", ql)
+    m_top = _TOP_RE.search(ql)
     if m_top:
         try: topk = max(3, min(20, int(m_top.group(1))))
         except: pass
@@ -80,68 +119,76 @@ def parse_query(q: str):
     )
 
 def filter_df(df: pd.DataFrame, intent: dict) -> pd.DataFrame:
-    out = df.copy()
+    out = df  # each boolean mask below already yields a new frame
     if intent["subject"]:
-        out = out[out["subject"].str.upper() == intent["subject"]]
+        out = out[out["subject"] == intent["subject"]]
     if intent["class_num"]:
-        out = out[out["class_num"].astype(str) == intent["class_num"]]
+        out = out[out["class_num"] == intent["class_num"]]
     if intent["term"]:
-        out = out[out["semester"].str.upper() == intent["term"]]
+        out = out[out["semester"] == intent["term"]]
     if intent["want_ml"]:
-        title_mask = out["class_title"].str.lower()
-        ml_mask = pd.Series(False, index=out.index)
-        for kw in ML_KEYWORDS:
-            ml_mask |= title_mask.str.contains(rf"\b{re.escape(kw)}\b", regex=True)
-        out = out[ml_mask]
+        out = out[out["class_title"].str.contains(_ML_RE, regex=True)]
     return out
 
+# simple scoring
+SCORE_SQL = {
+    True: "A_rate * 1.0 - DFW_rate * 0.7",    # prefer_easy
+    False: "DFW_rate * 1.0 - A_rate * 0.5",
+}
+
 def rank_instructors(df: pd.DataFrame, topk: int, prefer_easy=True) -> pd.DataFrame:
     """
     Aggregate by (subject, class_num, class_title, instructor) and rank.
     prefer_easy=True => higher A_rate and lower DFW_rate.
+    Rates are enrollment-weighted: computed once per group from the summed
+    grade counts, not per row. Aggregate, guardrail, sort and limit run as
+    one DuckDB query over `df`.
     """
     if df.empty:
         return df
 
-    grp_cols = ["subject","class_num","class_title","instructor"]
-    agg = (
-        df.groupby(grp_cols)
-          .agg(
-              total_students=("total_students","sum"),
-              semesters=("semester","nunique"),
-              A_rate=("A_rate","mean"),
-              B_rate=("B_rate","mean"),
-              C_rate=("C_rate","mean"),
-              DFW_rate=("DFW_rate","mean"),
-          )
-          .reset_index()
-    )
-
-    # simple scoring
-    if prefer_easy:
-        agg["score"] = agg["A_rate"] * 1.0 - agg["DFW_rate"] * 0.7
-    else:
-        agg["score"] = agg["DFW_rate"] * 1.0 - agg["A_rate"] * 0.5
-
-    # quality guardrails
-    agg = agg[agg["total_students"] >= 20]  # avoid ultra tiny sections
-    agg = agg.sort_values(["score","A_rate"], ascending=False).head(topk)
-    return agg
+    import pyarrow as pa  # already needed by pd.read_parquet
+
+    con = duckdb.connect()
+    # hand DuckDB an Arrow table: it scans that zero-copy for every pandas
+    # string dtype, unlike registering the DataFrame itself
+    con.register("sections", pa.Table.from_pandas(df, preserve_index=False))
+    try:
+        return con.execute(f"""
+            SELECT *, {SCORE_SQL[bool(prefer_easy)]} AS score
+            FROM (
+                SELECT
+                    subject, class_num, class_title, instructor,
+                    CAST(SUM(total_students) AS BIGINT) AS total_students,
+                    COUNT(DISTINCT semester)            AS semesters,
+                    100.0 * SUM(A) / SUM(total_students) AS A_rate,
+                    100.0 * SUM(B) / SUM(total_students) AS B_rate,
+                    100.0 * SUM(C) / SUM(total_students) AS C_rate,
+                    100.0 * SUM(D + F + withdrawn) / SUM(total_students) AS DFW_rate  -- crude “difficulty”
+                FROM sections
+                GROUP BY subject, class_num, class_title, instructor
+                HAVING SUM(total_students) >= 20    -- avoid ultra tiny sections
+            )
+            ORDER BY score DESC, A_rate DESC, subject, class_num, class_title, instructor
+            LIMIT ?
+        """, [int(topk)]).df()
+    finally:
+        con.close()
 
 def format_rows(rows: pd.DataFrame) -> str:
     if rows.empty:
         return "No matching results. Try adding/removing subject, course number, or term."
-    lines = []
-    for _, r in rows.iterrows():
-        line = (
-            f"{r['subject']} {r['class_num']} — {r['class_title']} | "
-            f"Instructor: {r['instructor']} | "
-            f"A≈{r['A_rate']:.1f}%  DFW≈{r['DFW_rate']:.1f}% | "
-            f"Students: {int(r['total_students'])} | "
-            f"Semesters: {int(r['semesters'])}"
-        )
-        lines.append(line)
-    return "\n".join(lines)
+    # column-wise string build: no per-row Series like iterrows()
+    pct = "{:.1f}".format
+    lines = (
+        rows["subject"].astype(str) + " " + rows["class_num"].astype(str)
+        + " — " + rows["class_title"].astype(str)
+        + " | Instructor: " + rows["instructor"].astype(str)
+        + " | A≈" + rows["A_rate"].map(pct) + "%  DFW≈" + rows["DFW_rate"].map(pct) + "%"
+        + " | Students: " + rows["total_students"].astype(int).astype(str)
+        + " | Semesters: " + rows["semesters"].astype(int).astype(str)
+    )
+    return "\n".join(lines.tolist())
 
 def answer(df: pd.DataFrame, q: str) -> str:
     intent = parse_query(q)
@@ -156,10 +203,18 @@ def answer(df: pd.DataFrame, q: str) -> str:
 
     return header + "\n" + format_rows(ranked)
 
+def _prewarm(df: pd.DataFrame) -> None:
+    # run one throwaway question while the user types the first real one, so
+    # DuckDB/Arrow setup and the title regex are not paid on that first answer
+    try:
+        answer(df, "easy ml")
+    except Exception:
+        pass
+
 def main():
     df = load_warehouse(WAREHOUSE_PATH)
-    df = add_rate_columns(df)
     print("🤖 Chatbot MVP ready. Ask things like:")
+    threading.Thread(target=_prewarm, args=(df,), daemon=True).start()
     print('  - "show easy ml courses"')
     print('  - "easy ml in CS"')
     print('  - "easiest instructor for CS 580"')
@@ -1,10 +1,24 @@
 import os
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # --- Step 1: API base URL ---
 BASE_URL = "https://uicgrades-api-adamnimer1.replit.app/api/specificCourse"
 
+# One keep-alive session for every request: the TCP + TLS handshake is paid
+# once per pooled connection, not once per course. Transient failures retry.
+MAX_WORKERS = 16
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=(429, 500, 502, 503, 504)),
+))
+
 # --- Step 2: function to fetch one course ---
 def fetch_course(subject, class_num):
     """
@@ -13,10 +27,10 @@ def fetch_course(subject, class_num):
     """
     # 1. Build URL with parameters
     params = {"subject": subject, "class_num": class_num}
-    response = requests.get(BASE_URL, params=params, timeout=30)
+    response = SESSION.get(BASE_URL, params=params, timeout=30)
     response.raise_for_status()  # will stop if something fails
 
-    data = response.json()["response"]
+    data = orjson.loads(response.content)["response"]
 
     # 2. Clean up small issues (like extra \r in semester)
     for row in data:
@@ -28,6 +42,18 @@ def fetch_course(subject, class_num):
 
     return df
 
+# --- Step 2b: fetch many courses in parallel (network-bound, so threads) ---
+def fetch_many(pairs):
+    """
+    Fetch several (subject, class_num) courses concurrently and stack them.
+    Example: fetch_many([("CS", "582"), ("CS", "580")])
+    """
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as ex:
+        dfs = list(ex.map(lambda p: fetch_course(*p), pairs))
+    if not dfs:
+        return pd.DataFrame()
+    return pd.concat(dfs, ignore_index=True)
+
 # --- Step 3: function to save CSV ---
 def save_course_csv(df, subject, class_num):
     os.makedirs("data/raw", exist_ok=True)
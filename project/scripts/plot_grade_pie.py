@@ -2,50 +2,55 @@
 import os
 import re
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 WAREHOUSE_PATH = "data/warehouse/grades_master.parquet"
 OUT_DIR = "reports/figures"
 
+# One Agg-backed figure, cleared after each save: no pyplot state machine
+# and no GUI backend probing.
+_FIG = Figure()
+FigureCanvasAgg(_FIG)
+
 def sanitize(s: str) -> str:
     s = re.sub(r"[^A-Za-z0-9]+", "_", s.strip())
     return s.strip("_") or "unknown"
 
-def load():
+COLUMNS = ["subject","class_num","instructor","semester","A","B","C","D","F","withdrawn","total_students"]
+
+def load(subject: str, class_num: str, term: str = ""):
     if not os.path.exists(WAREHOUSE_PATH):
         raise SystemExit(f"⚠️ Missing {WAREHOUSE_PATH}. Run the warehouse step first.")
+    # warehouse values are trimmed + upper-cased, so the course/term can be
+    # pushed into the read: only matching row groups and needed columns are decoded
+    filters = [("subject", "=", subject), ("class_num", "=", class_num)]
+    if term:
+        filters.append(("semester", "=", term))
     try:
-        return pd.read_parquet(WAREHOUSE_PATH)
+        return pd.read_parquet(WAREHOUSE_PATH, columns=COLUMNS, filters=filters, dtype_backend="pyarrow")
     except Exception as e:
         raise SystemExit(f"Could not read {WAREHOUSE_PATH}: {e}")
 
 def main():
-    df = load()
-
     subject = input("Subject (e.g., CS): ").strip().upper()
     class_num = input("Class number (e.g., 580): ").strip()
     instructor = input("Instructor (full or partial, e.g., Yu): ").strip()
     term = input("Term (e.g., FA23) or leave blank for ALL: ").strip().upper()
 
-    # basic filters
-    mask = (df["subject"].astype(str).str.upper() == subject) & \
-           (df["class_num"].astype(str).str.strip() == class_num)
-
-    if term:
-        mask &= (df["semester"].astype(str).str.upper() == term)
+    df = load(subject, class_num, term)
 
+    # subject / class_num / term were already matched by the filtered read
+    course = df
     if instructor:
-        mask &= df["instructor"].astype(str).str.contains(instructor, case=False, na=False)
-
-    course = df.loc[mask].copy()
+        course = df.loc[df["instructor"].astype(str).str.contains(instructor, case=False, na=False)]
     if course.empty:
         print("😕 No matching rows. Check inputs.")
         return
 
     # sum across matching sections
     numeric = ["A","B","C","D","F","withdrawn","total_students"]
-    for col in numeric:
-        course[col] = pd.to_numeric(course[col], errors="coerce").fillna(0).astype(int)
+    course = course.assign(**{c: pd.to_numeric(course[c], errors="coerce").fillna(0).astype(int) for c in numeric})
     agg = course[numeric].sum()
 
     # prepare pie
@@ -57,13 +62,13 @@ def main():
         return
 
     # plot
-    plt.figure()
-    plt.pie(values, labels=[f"{l} ({v})" for l,v in zip(labels, values)],
-            autopct=lambda p: f"{p:.1f}%")
+    ax = _FIG.add_subplot()
+    ax.pie(values, labels=[f"{l} ({v})" for l,v in zip(labels, values)],
+           autopct=lambda p: f"{p:.1f}%")
     title_parts = [f"{subject} {class_num}"]
     if instructor: title_parts.append(instructor)
     if term: title_parts.append(term)
-    plt.title(" • ".join(title_parts))
+    ax.set_title(" • ".join(title_parts))
 
     # save
     os.makedirs(OUT_DIR, exist_ok=True)
@@ -71,8 +76,8 @@ def main():
     if instructor: fname += f"_{sanitize(instructor)}"
     if term: fname += f"_{sanitize(term)}"
     out_path = os.path.join(OUT_DIR, f"{fname}.png")
-    plt.savefig(out_path, bbox_inches="tight")
-    plt.close()
+    _FIG.savefig(out_path, bbox_inches="tight")
+    _FIG.clear()
     print(f"✅ Saved pie chart -> {out_path}")
 
 if __name__ == "__main__":
@@ -1,25 +1,31 @@
 # scripts/plot_one.py
 from pathlib import Path
 import duckdb
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import argparse
 
 WAREHOUSE = Path("data/warehouse/grades_master.parquet")
 
+# Agg-backed figure reused across plots (cleared after each save)
+_FIG = Figure(figsize=(6, 6))
+FigureCanvasAgg(_FIG)
+
 def fetch_data(subject: str, class_num: str, instructor: str):
     con = duckdb.connect()
+    # bound parameters: user input never lands in the SQL text
     sql = f"""
         SELECT
             subject, class_num, class_title, instructor, semester,
             A, B, C, D, F, withdrawn, total_students
-        FROM '{WAREHOUSE.as_posix()}'
-        WHERE UPPER(subject) = '{subject.upper()}'
-          AND class_num = '{class_num}'
-          AND LOWER(instructor) LIKE '%{instructor.lower()}%'
+        FROM read_parquet('{WAREHOUSE.as_posix()}')
+        WHERE UPPER(subject) = ?
+          AND class_num = ?
+          AND LOWER(instructor) LIKE ?
         ORDER BY semester DESC
         LIMIT 1
     """
-    df = con.execute(sql).df()
+    df = con.execute(sql, [subject.upper(), class_num, f"%{instructor.lower()}%"]).df()
     con.close()
     return df
 
@@ -33,16 +39,16 @@ def plot_pie(df):
     counts = [row[g] for g in grades]
     title = f"{row['subject']} {row['class_num']} — {row['class_title']}\n{row['instructor']} ({row['semester']})"
 
-    plt.figure(figsize=(6, 6))
-    plt.pie(counts, labels=grades, autopct='%1.1f%%', startangle=90)
-    plt.title(title)
-    plt.tight_layout()
+    ax = _FIG.add_subplot()
+    ax.pie(counts, labels=grades, autopct='%1.1f%%', startangle=90)
+    ax.set_title(title)
+    _FIG.tight_layout()
 
     out_dir = Path("plots")
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / f"{row['subject']}_{row['class_num']}_{row['instructor'].split()[0]}_{row['semester']}.png"
-    plt.savefig(out_path, dpi=200)
-    plt.close()
+    _FIG.savefig(out_path, dpi=200)
+    _FIG.clear()
     print(f"✅ Saved pie chart to {out_path}")
 
 if __name__ == "__main__":
@@ -1,6 +1,8 @@
 import os
+import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 # -------- 1) Ask which processed summary to plot ----------
 # Example: if your earlier file was data/processed/summary_CS_582.csv
@@ -33,68 +35,70 @@ df = df.sort_values("Difficulty_Index", ascending=False).reset_index(drop=True)
 # Make sure the output directory exists
 os.makedirs("data/figures", exist_ok=True)
 
+# One Agg-backed figure for both charts, cleared between them (no pyplot)
+fig = Figure(figsize=(12, 6))
+FigureCanvasAgg(fig)
+
 # A helper to build a green↔red color ramp from difficulty
 def difficulty_colors(series):
     """
     Map Difficulty_Index (min = easiest, max = hardest) to a red→green gradient.
     Highest difficulty = more red; lowest = more green.
     """
-    s = series.astype(float)
-    if s.max() == s.min():
+    s = series.to_numpy(dtype=float)
+    lo, hi = s.min(), s.max()
+    if hi == lo:
         # All the same difficulty -> use neutral gray
         return ["#888888"] * len(s)
 
     # Normalize 0..1 (0=easiest, 1=hardest)
-    norm = (s - s.min()) / (s.max() - s.min())
-    # Build hex colors by interpolating:
+    norm = (s - lo) / (hi - lo)
+    # Build hex colors by interpolating all channels at once:
     # hard (1.0) -> red (#d62728), easy (0.0) -> green (#2ca02c)
-    hard_rgb = (0xD6, 0x27, 0x28)
-    easy_rgb = (0x2C, 0xA0, 0x2C)
-    colors = []
-    for v in norm:
-        r = int(easy_rgb[0] + (hard_rgb[0] - easy_rgb[0]) * v)
-        g = int(easy_rgb[1] + (hard_rgb[1] - easy_rgb[1]) * v)
-        b = int(easy_rgb[2] + (hard_rgb[2] - easy_rgb[2]) * v)
-        colors.append(f"#{r:02x}{g:02x}{b:02x}")
-    return colors
+    hard_rgb = np.array([0xD6, 0x27, 0x28])
+    easy_rgb = np.array([0x2C, 0xA0, 0x2C])
+    rgb = (easy_rgb + (hard_rgb - easy_rgb) * norm[:, None]).astype(np.uint8)
+    return ["#%02x%02x%02x" % tuple(row) for row in rgb.tolist()]
 
 # -------- 3) Plot: Difficulty Index by instructor ----------
 instructors = df["instructor"].tolist()
 diff_vals = df["Difficulty_Index"].tolist()
 colors = difficulty_colors(df["Difficulty_Index"])
 
-plt.figure(figsize=(12, 6))
-bars = plt.bar(instructors, diff_vals, edgecolor="black", linewidth=0.6, color=colors)
-plt.title("Difficulty Index by Instructor (higher = tougher)", pad=12)
-plt.ylabel("Difficulty Index")
-plt.xticks(rotation=45, ha="right")
-plt.tight_layout()
+ax = fig.add_subplot()
+bars = ax.bar(instructors, diff_vals, edgecolor="black", linewidth=0.6, color=colors)
+ax.set_title("Difficulty Index by Instructor (higher = tougher)", pad=12)
+ax.set_ylabel("Difficulty Index")
+for lbl in ax.get_xticklabels():
+    lbl.set(rotation=45, ha="right")
+fig.tight_layout()
 
 # Annotate bars with values
 for b, v in zip(bars, diff_vals):
-    plt.text(b.get_x() + b.get_width()/2, b.get_height() + 0.5, f"{v:.1f}", ha="center", va="bottom", fontsize=8)
+    ax.text(b.get_x() + b.get_width()/2, b.get_height() + 0.5, f"{v:.1f}", ha="center", va="bottom", fontsize=8)
 
 fig1_path = os.path.join("data", "figures", f"{os.path.splitext(os.path.basename(file_path))[0]}_difficulty.png")
-plt.savefig(fig1_path, dpi=150)
-plt.close()
+fig.savefig(fig1_path, dpi=150)
+fig.clear()
 print(f"✅ Saved: {fig1_path}")
 
 # -------- 4) Plot: A% by instructor ----------
 a_vals = df["A_pct"].tolist()
 
-plt.figure(figsize=(12, 6))
-bars = plt.bar(instructors, a_vals, edgecolor="black", linewidth=0.6)
-plt.title("A Percentage by Instructor", pad=12)
-plt.ylabel("A (%)")
-plt.xticks(rotation=45, ha="right")
-plt.tight_layout()
+ax = fig.add_subplot()
+bars = ax.bar(instructors, a_vals, edgecolor="black", linewidth=0.6)
+ax.set_title("A Percentage by Instructor", pad=12)
+ax.set_ylabel("A (%)")
+for lbl in ax.get_xticklabels():
+    lbl.set(rotation=45, ha="right")
+fig.tight_layout()
 
 for b, v in zip(bars, a_vals):
-    plt.text(b.get_x() + b.get_width()/2, b.get_height() + 0.5, f"{v:.1f}%", ha="center", va="bottom", fontsize=8)
+    ax.text(b.get_x() + b.get_width()/2, b.get_height() + 0.5, f"{v:.1f}%", ha="center", va="bottom", fontsize=8)
 
 fig2_path = os.path.join("data", "figures", f"{os.path.splitext(os.path.basename(file_path))[0]}_A_pct.png")
-plt.savefig(fig2_path, dpi=150)
-plt.close()
+fig.savefig(fig2_path, dpi=150)
+fig.clear()
 print(f"✅ Saved: {fig2_path}")
 
 print("\nDone. Open the images in data/figures/ to view the charts.")
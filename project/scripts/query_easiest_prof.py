@@ -6,12 +6,21 @@ import pandas as pd
 ANALYTICS_PATH = os.getenv("ANALYTICS_PATH", "data/analytics/grades_analytics.parquet")
 WAREHOUSE_PATH = "data/warehouse/grades_master.parquet"
 
-def load_any_parquet(path: str) -> pd.DataFrame:
+NEEDED_COLUMNS = ["subject","class_num","instructor","semester","A","B","C","D","F","withdrawn","total_students"]
+
+def load_any_parquet(path: str, filters=None) -> pd.DataFrame:
     if not os.path.exists(path):
         print(f"⚠️ File not found: {path}")
         sys.exit(1)
     try:
-        return pd.read_parquet(path)           # needs pyarrow (or fastparquet)
+        import pyarrow.parquet as pq
+        missing = set(NEEDED_COLUMNS) - set(pq.read_schema(path).names)
+        if missing:
+            print(f"⚠️ Missing columns in data: {sorted(missing)}")
+            sys.exit(1)
+        # only decode the columns we use, and let pyarrow skip row groups
+        # whose statistics rule out the requested course
+        return pd.read_parquet(path, columns=NEEDED_COLUMNS, filters=filters, dtype_backend="pyarrow")
     except Exception as e:
         print(f"Failed to read {path}: {e}")
         sys.exit(1)
@@ -24,28 +33,27 @@ def main():
 
     # ---- Load analytics if available; otherwise fall back to warehouse and compute on the fly ----
     if os.path.exists(ANALYTICS_PATH):
+        # not written by our pipeline: normalize the keys before filtering
         df = load_any_parquet(ANALYTICS_PATH)
+        mask = (
+            (df["subject"].astype(str).str.strip().str.upper() == subject)
+            & (df["class_num"].astype(str).str.strip() == class_num)
+        )
+        if term_filter:
+            mask &= (df["semester"].astype(str).str.strip().str.upper() == term_filter)
+        course = df.loc[mask].copy()
     else:
-        df = load_any_parquet(WAREHOUSE_PATH)
-
-    # ---- Basic sanity columns (work with either analytics or warehouse) ----
-    needed = {"subject","class_num","instructor","semester","A","B","C","D","F","withdrawn","total_students"}
-    missing = needed - set(map(str, df.columns))
-    if missing:
-        print(f"⚠️ Missing columns in data: {sorted(missing)}")
-        sys.exit(1)
+        # rebuild_warehouse_from_raw.py stores subject/class_num/semester
+        # trimmed and upper-cased, so the course (+ optional term) is
+        # filtered while reading
+        filters = [("subject", "=", subject), ("class_num", "=", class_num)]
+        if term_filter:
+            filters.append(("semester", "=", term_filter))
+        course = load_any_parquet(WAREHOUSE_PATH, filters)
 
     # Coerce types safely
-    df["subject"] = df["subject"].astype(str).str.upper()
-    df["class_num"] = df["class_num"].astype(str).str.strip()
     for col in ["A","B","C","D","F","withdrawn","total_students"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce").fillna(0).astype(int)
-
-    # ---- Filter to the course (+ optional term) ----
-    mask = (df["subject"] == subject) & (df["class_num"] == class_num)
-    if term_filter:
-        mask &= (df["semester"].astype(str).str.upper() == term_filter)
-    course = df.loc[mask].copy()
+        course[col] = pd.to_numeric(course[col], errors="coerce").fillna(0).astype(int)
 
     if course.empty:
         print("😕 No rows match that course/term. Try a different term or check your inputs.")
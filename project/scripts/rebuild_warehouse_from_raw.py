@@ -1,115 +1,269 @@
 # scripts/rebuild_warehouse_from_raw.py
 
+import argparse
+import csv
+import glob
+import json
 import os
+import sys
 from pathlib import Path
 import duckdb
 
+# scripts/ is not a package: make chatbot.* importable when run as a file
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from chatbot.actions import build_native_warehouse  # noqa: E402
+
 RAW_GLOB = "data/raw/*.csv"
+# Types sniffed from an export whose header isn't RAW_COLUMNS, saved after the
+# first successful rebuild so later runs can skip the sniffer too
+SCHEMA_CACHE = Path("data/raw/.schema.json")
 WAREHOUSE_PATH = Path("data/warehouse/grades_master.parquet")
+# DuckDB-native copy used by the chatbot/API and view_patterns.py
+WAREHOUSE_DB = WAREHOUSE_PATH.with_suffix(".duckdb")
 
 # 👇 EDIT THIS when you load a new term file
 # Example: "FA24", "SP24", "FA23", etc.
 TERM_CODE = "FA24"
 
+# Raw grade-count columns -> warehouse names, in export order
+GRADE_COLUMNS = {
+    "A": "A", "B": "B", "C": "C", "D": "D", "F": "F",
+    "ADV": "adv", "CR": "credit", "DFR": "deferred", "I": "incomplete",
+    "NG": "non_graded", "NR": "not_reported", "O": "O", "PR": "PR",
+    "S": "satisfactory", "U": "unsatisfactory", "W": "withdrawn",
+}
 
-def main():
-    con = duckdb.connect()
+# Column types of the registrar's CSV export. Reading with a declared schema
+# skips DuckDB's per-file type sniffing; the types match what the sniffer
+# infers, so the warehouse schema is the same either way.
+RAW_COLUMNS = {
+    "CRS SUBJ CD": "VARCHAR",
+    "CRS NBR": "BIGINT",
+    "CRS TITLE": "VARCHAR",
+    "DEPT CD": "BIGINT",
+    "DEPT NAME": "VARCHAR",
+    **{g: "BIGINT" for g in GRADE_COLUMNS},
+    "Primary Instructor": "VARCHAR",
+    "Grade Regs": "BIGINT",
+}
+
+# Parquet write settings. ZSTD gives noticeably smaller files than DuckDB's
+# default Snappy for the text-heavy title/instructor columns, and ~100k-row
+# row groups keep min/max stats on subject/class_num/semester selective
+# enough for readers to skip groups.
+PARQUET_CODEC = "zstd"
+PARQUET_COMPRESSION_LEVEL = 3
+PARQUET_ROW_GROUP_SIZE = 100_000
+
+
+def _raw_headers() -> set:
+    """Distinct header rows of the raw CSVs (only the first line of each is read)."""
+    headers = set()
+    for path in glob.glob(RAW_GLOB):
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            headers.add(tuple(next(csv.reader(f), ())))
+    return headers
+
+
+def _raw_schema(headers: set):
+    """
+    Column -> DuckDB type for the raw CSVs when it is known up front: the
+    registrar export's RAW_COLUMNS, or a cached schema with the same header.
+    None means the types have to be sniffed.
+    """
+    if headers == {tuple(RAW_COLUMNS)}:
+        return RAW_COLUMNS
+    if len(headers) == 1 and SCHEMA_CACHE.exists():
+        with open(SCHEMA_CACHE, encoding="utf-8") as f:
+            cached = json.load(f)
+        if headers == {tuple(cached)}:
+            return cached
+    return None
+
+
+def _raw_source(schema) -> str:
+    """
+    SQL table function for the raw CSVs: a typed read_csv when the schema is
+    known, else read_csv_auto (e.g. when onboarding a new export).
+    """
+    if schema is not None:
+        columns = ", ".join(f"'{name}': '{typ}'" for name, typ in schema.items())
+        return f"read_csv('{RAW_GLOB}', header = TRUE, auto_detect = FALSE, columns = {{{columns}}})"
+    return f"read_csv_auto('{RAW_GLOB}', header = TRUE)"
+
+
+def _parquet_options(codec: str, level: int, row_group_size: int) -> str:
+    opts = ["FORMAT 'parquet'", f"CODEC '{codec}'", f"ROW_GROUP_SIZE {row_group_size}"]
+    if codec.lower() == "zstd":
+        # DuckDB only accepts a compression level for ZSTD
+        opts.append(f"COMPRESSION_LEVEL {level}")
+    return ", ".join(opts)
+
+
+def _write_with_polars(args, schema) -> None:
+    """
+    Same transform as the DuckDB COPY in main(), as a polars lazy query
+    streamed to the Parquet file with bounded memory.
+    """
+    import polars as pl
+
+    dtypes = {"VARCHAR": pl.String, "BIGINT": pl.Int64}
+
+    def trimmed(col: str):
+        # DuckDB's TRIM strips spaces only
+        return pl.col(col).cast(pl.String).str.strip_chars(" ")
 
-    # 1) Read all CSVs in data/raw into a temporary table
-    con.execute(
-        f"""
-        CREATE OR REPLACE TABLE grades_raw AS
-        SELECT * FROM read_csv_auto(
-            '{RAW_GLOB}',
-            header := TRUE
-        );
-        """
+    overrides = {c: dtypes[t] for c, t in (schema or {}).items() if t in dtypes}
+    lf = pl.scan_csv(RAW_GLOB, schema_overrides=overrides)
+    lf = lf.select(
+        trimmed("CRS SUBJ CD").str.to_uppercase().alias("subject"),
+        trimmed("CRS NBR").alias("class_num"),
+        trimmed("CRS TITLE").alias("class_title"),
+        trimmed("DEPT CD").alias("dept_code"),
+        trimmed("DEPT NAME").alias("dept_name"),
+        trimmed("Primary Instructor").alias("instructor"),
+        pl.lit(args.term).alias("semester"),
+        *[pl.col(raw).fill_null(0).alias(name) for raw, name in GRADE_COLUMNS.items()],
+        pl.col("Grade Regs").alias("grade_regs"),
+    ).select(
+        pl.exclude("grade_regs"),
+        pl.coalesce("grade_regs", pl.sum_horizontal(*GRADE_COLUMNS.values())).alias("total_students"),
+    ).sort(["subject", "class_num", "semester"], descending=[False, False, True])
+    lf.sink_parquet(
+        WAREHOUSE_PATH,
+        compression=args.codec,
+        # polars, like DuckDB, only takes a level for some codecs
+        compression_level=args.compression_level if args.codec.lower() == "zstd" else None,
+        row_group_size=args.row_group_size,
     )
 
-    # 2) Show columns so we can verify structure
-    cols = con.execute("PRAGMA table_info('grades_raw')").fetchall()
-    print("\n✅ Columns in grades_raw:\n")
-    for i, row in enumerate(cols, start=1):
-        # row = (cid, name, type, notnull, dflt_value, pk)
-        print(f"{i:2d}. '{row[1]}'")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild the Parquet warehouse from the raw CSV exports.")
+    # stored trimmed + upper-cased like subject/class_num, so readers can filter on it as-is
+    parser.add_argument("--term", default=TERM_CODE, type=lambda s: s.strip().upper(),
+                        help=f"semester code for every row (default: {TERM_CODE})")
+    parser.add_argument("--codec", default=PARQUET_CODEC, help="Parquet codec, e.g. zstd, snappy, lz4")
+    parser.add_argument("--compression-level", type=int, default=PARQUET_COMPRESSION_LEVEL,
+                        help="ZSTD level (ignored for other codecs)")
+    parser.add_argument("--row-group-size", type=int, default=PARQUET_ROW_GROUP_SIZE)
+    parser.add_argument("--engine", choices=["duckdb", "polars"], default="duckdb",
+                        help="engine for the CSV -> Parquet step (polars is optional)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.engine == "polars":
+        try:
+            import polars  # noqa: F401
+        except ImportError:
+            print("⚠️ polars is not installed; using DuckDB.")
+            args.engine = "duckdb"
+    con = duckdb.connect()
+
+    # 1) All CSVs in data/raw. Nothing is staged in a table: the CSVs are
+    # scanned once, by the COPY in step 4.
+    headers = _raw_headers()
+    schema = _raw_schema(headers)
+    if schema is None and headers:
+        print("⚠️ Raw CSV headers differ from RAW_COLUMNS; sniffing column types instead.")
+    raw = _raw_source(schema)
+
+    # 2) Show columns so we can verify structure (DESCRIBE only binds the read)
+    described = con.execute(f"DESCRIBE SELECT * FROM {raw}").df()
+    names = described["column_name"]
+    print("\n✅ Columns in raw CSVs:\n")
+    print("\n".join(f"{i:2d}. '{name}'" for i, name in enumerate(names, start=1)))
 
     # 3) Transform into our normalized warehouse schema
-    con.execute(
-        f"""
-        CREATE OR REPLACE TABLE grades_clean AS
+    clean_sql = f"""
+        WITH cleaned AS (
+            SELECT
+                UPPER(TRIM("CRS SUBJ CD"))               AS subject,
+                TRIM(CAST("CRS NBR" AS VARCHAR))         AS class_num,
+                TRIM("CRS TITLE")                        AS class_title,
+                TRIM(CAST("DEPT CD" AS VARCHAR))         AS dept_code,
+                TRIM("DEPT NAME")                        AS dept_name,
+                TRIM("Primary Instructor")               AS instructor,
+
+                -- All rows in this rebuild are for the same term
+                '{args.term}'                            AS semester,
+
+                -- grade buckets (coalesce nulls to 0)
+                COALESCE("A",   0)                       AS A,
+                COALESCE("B",   0)                       AS B,
+                COALESCE("C",   0)                       AS C,
+                COALESCE("D",   0)                       AS D,
+                COALESCE("F",   0)                       AS F,
+                COALESCE("ADV", 0)                       AS adv,
+                COALESCE("CR",  0)                       AS credit,
+                COALESCE("DFR", 0)                       AS deferred,
+                COALESCE("I",   0)                       AS incomplete,
+                COALESCE("NG",  0)                       AS non_graded,
+                COALESCE("NR",  0)                       AS not_reported,
+                COALESCE("O",   0)                       AS O,
+                COALESCE("PR",  0)                       AS PR,
+                COALESCE("S",   0)                       AS satisfactory,
+                COALESCE("U",   0)                       AS unsatisfactory,
+                COALESCE("W",   0)                       AS withdrawn,
+
+                "Grade Regs"                             AS grade_regs
+            FROM {raw}
+        )
         SELECT
-            UPPER(TRIM("CRS SUBJ CD"))                   AS subject,
-            TRIM(CAST("CRS NBR" AS VARCHAR))             AS class_num,
-            TRIM("CRS TITLE")                            AS class_title,
-            TRIM(CAST("DEPT CD" AS VARCHAR))             AS dept_code,
-            TRIM("DEPT NAME")                            AS dept_name,
-            TRIM("Primary Instructor")                   AS instructor,
-
-            -- All rows in this rebuild are for the same term
-            '{TERM_CODE}'                                AS semester,
-
-            -- grade buckets (coalesce nulls to 0)
-            COALESCE("A",   0)                           AS A,
-            COALESCE("B",   0)                           AS B,
-            COALESCE("C",   0)                           AS C,
-            COALESCE("D",   0)                           AS D,
-            COALESCE("F",   0)                           AS F,
-            COALESCE("ADV", 0)                           AS adv,
-            COALESCE("CR",  0)                           AS credit,
-            COALESCE("DFR", 0)                           AS deferred,
-            COALESCE("I",   0)                           AS incomplete,
-            COALESCE("NG",  0)                           AS non_graded,
-            COALESCE("NR",  0)                           AS not_reported,
-            COALESCE("O",   0)                           AS O,
-            COALESCE("PR",  0)                           AS PR,
-            COALESCE("S",   0)                           AS satisfactory,
-            COALESCE("U",   0)                           AS unsatisfactory,
-            COALESCE("W",   0)                           AS withdrawn,
+            * EXCLUDE (grade_regs),
 
             -- total students:
-            -- prefer official Grade Regs, else sum grades
+            -- prefer official Grade Regs, else sum the (already coalesced) grades
+            -- with one list_sum instead of a chain of 15 additions; list_sum
+            -- widens to HUGEINT, so cast back to keep the column BIGINT
             COALESCE(
-                "Grade Regs",
-                COALESCE("A",   0) +
-                COALESCE("B",   0) +
-                COALESCE("C",   0) +
-                COALESCE("D",   0) +
-                COALESCE("F",   0) +
-                COALESCE("ADV", 0) +
-                COALESCE("CR",  0) +
-                COALESCE("DFR", 0) +
-                COALESCE("I",   0) +
-                COALESCE("NG",  0) +
-                COALESCE("NR",  0) +
-                COALESCE("O",   0) +
-                COALESCE("PR",  0) +
-                COALESCE("S",   0) +
-                COALESCE("U",   0) +
-                COALESCE("W",   0)
+                grade_regs,
+                CAST(list_sum([
+                    A, B, C, D, F, adv, credit, deferred, incomplete,
+                    non_graded, not_reported, O, PR, satisfactory,
+                    unsatisfactory, withdrawn
+                ]) AS BIGINT)
             )                                            AS total_students
+        FROM cleaned
+        -- clustered on the lookup keys: tight row-group min/max stats for
+        -- subject/class_num filters, and per-course rows already newest-first
+        ORDER BY subject, class_num, semester DESC
+    """
 
-        FROM grades_raw;
-        """
-    )
-
-    # 4) Export to Parquet warehouse
+    # 4) Stream CSV -> cleaned rows -> Parquet warehouse in one pipeline
     os.makedirs(WAREHOUSE_PATH.parent, exist_ok=True)
-    con.execute(
-        f"""
-        COPY grades_clean
-        TO '{WAREHOUSE_PATH.as_posix()}'
-        (FORMAT 'parquet');
-        """
-    )
-
-    n = con.execute("SELECT COUNT(*) FROM grades_clean").fetchone()[0]
+    if args.engine == "polars":
+        _write_with_polars(args, schema)
+        # answered from the Parquet footer, not by rescanning rows
+        n = con.execute(f"SELECT COUNT(*) FROM read_parquet('{WAREHOUSE_PATH.as_posix()}')").fetchone()[0]
+    else:
+        # COPY reports how many rows it wrote
+        n = con.execute(
+            f"""
+            COPY ({clean_sql})
+            TO '{WAREHOUSE_PATH.as_posix()}'
+            ({_parquet_options(args.codec, args.compression_level, args.row_group_size)});
+            """
+        ).fetchone()[0]
     print(
         f"\n✅ Warehouse rebuilt: {WAREHOUSE_PATH} "
-        f"({n} rows, semester = '{TERM_CODE}')"
+        f"({n} rows, semester = '{args.term}')"
     )
 
     con.close()
 
+    if schema is None and len(headers) == 1:
+        # the sniffed types worked: reuse them until the header changes
+        with open(SCHEMA_CACHE, "w", encoding="utf-8") as f:
+            json.dump(dict(zip(names, described["column_type"])), f, indent=2)
+        print(f"✅ Cached sniffed CSV schema: {SCHEMA_CACHE}")
+
+    # 5) Refresh the native DuckDB copy now, rather than on the next app start
+    build_native_warehouse(WAREHOUSE_PATH, WAREHOUSE_DB)
+    print(f"✅ Native warehouse refreshed: {WAREHOUSE_DB}")
+
 
 if __name__ == "__main__":
     main()
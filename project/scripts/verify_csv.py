@@ -1,4 +1,5 @@
 import os
+import duckdb
 import pandas as pd
 
 # --- Step 1: ask the user which file to verify ---
@@ -18,22 +19,33 @@ if not os.path.exists(file_path):
     print(f"⚠️ File not found: {file_path}")
     exit()
 
-# --- Step 4: load CSV ---
+# --- Step 4: probe CSV ---
+# DuckDB streams the file: only the sample rows and one row of counts come
+# back to Python, instead of the whole table as a DataFrame.
 try:
-    df = pd.read_csv(file_path)
+    con = duckdb.connect()
+    con.execute(f"CREATE VIEW v AS SELECT * FROM read_csv_auto('{file_path}')")
+    columns = [row[0] for row in con.execute("DESCRIBE v").fetchall()]
+    sample = con.execute("SELECT * FROM v LIMIT 3").df()
+    # row count plus per-column nulls in a single pass
+    counts = con.execute(
+        "SELECT COUNT(*), " + ", ".join(f'COUNT(*) - COUNT("{c}")' for c in columns) + " FROM v"
+    ).fetchone()
+    con.close()
 except Exception as e:
     print(f"❌ Failed to read CSV: {e}")
     exit()
+n_rows = counts[0]
 
 # --- Step 5: show quick info ---
-print(f"\n✅ Loaded {len(df)} rows from {file_path}")
+print(f"\n✅ Loaded {n_rows} rows from {file_path}")
 print("\n📋 Columns in this CSV:")
-print(df.columns.tolist())
+print(columns)
 print("\n🔍 Sample data:")
-print(df.head(3).to_string(index=False))
+print(sample.to_string(index=False))
 
 # --- Step 6: check for missing values ---
-missing_values = df.isnull().sum()
+missing_values = pd.Series(counts[1:], index=columns)
 if missing_values.any():
     print("\n⚠️ Missing values detected:")
     print(missing_values[missing_values > 0])
@@ -48,8 +60,11 @@ expected_columns = [
     "withdrawn","instructor","total_students","semester"
 ]
 
-missing_cols = [c for c in expected_columns if c not in df.columns]
-extra_cols = [c for c in df.columns if c not in expected_columns]
+# frozensets make each membership test O(1); filtering the lists (rather
+# than printing the bare set differences) keeps the columns in file order
+expected, actual = frozenset(expected_columns), frozenset(columns)
+missing_cols = [c for c in expected_columns if c not in actual]
+extra_cols = [c for c in columns if c not in expected]
 
 if not missing_cols and not extra_cols:
     print("\n✅ Column structure looks correct.")
@@ -1,14 +1,48 @@
 # scripts/view_pattern.py
+from functools import lru_cache
 from pathlib import Path
+import sys
 import duckdb
 import argparse
+import numpy as np
 import pandas as pd
 
+# scripts/ is not a package: make chatbot.* importable when run as a file
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+from chatbot.actions import native_is_stale  # noqa: E402
+
 WAREHOUSE = Path("data/warehouse/grades_master.parquet")
+# Native DuckDB copy written by rebuild_warehouse_from_raw.py (and by the
+# chatbot on startup); its `grades` table keeps the sections with students
+# and adds a pre-lowered instructor_lc for name matching.
+WAREHOUSE_DB = WAREHOUSE.with_suffix(".duckdb")
 
-def show_pattern(subject: str, class_num: str, instructor: str):
+@lru_cache(maxsize=1)
+def _open_warehouse():
+    """
+    Return a connection exposing the warehouse as `grades`: the native
+    database when it is current (as new as the Parquet file, same schema
+    version), otherwise a view over the Parquet file. Opened once per
+    process and reused by every show_pattern() call.
+    """
+    if not native_is_stale(WAREHOUSE, WAREHOUSE_DB):
+        return duckdb.connect(str(WAREHOUSE_DB), read_only=True)
     con = duckdb.connect()
-    sql = f"""
+    # keep Parquet footers (schema, row-group stats) cached between queries
+    con.execute("SET enable_object_cache = true")
+    # same rows as the native `grades` table: sections with students only.
+    # SELECT * here is fine: the query's own column list is pushed down into
+    # the read_parquet scan, so unreferenced column chunks are never decoded.
+    con.execute(
+        f"CREATE VIEW grades AS SELECT *, LOWER(instructor) AS instructor_lc "
+        f"FROM read_parquet('{WAREHOUSE.as_posix()}') WHERE total_students > 0"
+    )
+    return con
+
+def show_pattern(subject: str, class_num: str, instructor: str):
+    con = _open_warehouse()
+    # values are bound, not spliced in: the text is identical for every call
+    sql = """
         SELECT
             semester,
             subject,
@@ -16,16 +50,18 @@ def show_pattern(subject: str, class_num: str, instructor: str):
             class_title,
             instructor,
             total_students,
-            ROUND((A * 100.0 / total_students), 1) AS A_pct,
-            ROUND(((D + F + withdrawn) * 100.0 / total_students), 1) AS DFW_pct
-        FROM '{WAREHOUSE.as_posix()}'
-        WHERE UPPER(subject) = '{subject.upper()}'
-          AND class_num = '{class_num}'
-          AND LOWER(instructor) LIKE '%{instructor.lower()}%'
+            A * 100.0 / NULLIF(total_students, 0) AS A_pct,
+            (D + F + withdrawn) * 100.0 / NULLIF(total_students, 0) AS DFW_pct
+        FROM grades
+        WHERE UPPER(subject) = ?
+          AND class_num = ?
+          AND instructor_lc LIKE ?
         ORDER BY semester DESC
     """
-    df = con.execute(sql).df()
-    con.close()
+    df = con.execute(sql, [subject.upper(), class_num, f"%{instructor.lower()}%"]).df()
+    # rounding is presentation only: do it once on the result, not per scanned
+    # row. Halves round up like SQL ROUND (DataFrame.round would go to even).
+    df[["A_pct", "DFW_pct"]] = np.floor(df[["A_pct", "DFW_pct"]] * 10 + 0.5) / 10
     if df.empty:
         print("No matching rows.")
     else:
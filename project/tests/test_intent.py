@@ -1,19 +1,26 @@
-from chatbot.intent import parse
+import pytest
 
-def test_basic_cs580():
-    p = parse("easy cs 580 recent --explain")
-    assert p["polarity"] == "easy"
-    assert p["subject"] == "CS"
-    assert p["class_num"] == "580"
-    assert p["recent"] is True
-    assert p["explain"] is True
+from chatbot import nlu_rules
+from chatbot.intent import parse
 
-def test_keywords():
-    p = parse("show easy ml courses 500-level")
-    assert "ml" in p["keywords"]
-    assert p["level"] == 500
+@pytest.mark.parametrize("text,expected,keywords", [
+    ("easy cs 580 recent --explain",
+     {"polarity": "easy", "subject": "CS", "class_num": "580", "recent": True, "explain": True}, []),
+    ("show easy ml courses 500-level", {"level": 500}, ["ml"]),
+    ("details cs 580 prof yu", {"details": True, "instructor_like": "yu"}, []),
+])
+def test_parse(text, expected, keywords):
+    p = parse(text)
+    assert {k: p[k] for k in expected} == expected
+    for kw in keywords:
+        assert kw in p["keywords"]
 
-def test_instructor():
-    p = parse("details cs 580 prof yu")
-    assert p["details"] is True
-    assert p["instructor_like"] == "yu"
+@pytest.mark.parametrize("text", [
+    "easy", "hard", "ml", "easy ml", "strict ml", "ML Easy", "  tough  ",
+    "chill good", "difficult easiest", "lenient",
+])
+def test_rule_fast_path_matches_full_parse(text, monkeypatch):
+    fast = nlu_rules.parse_user_text(text)
+    # an empty TRIVIAL_WORDS forces every query through the regex path
+    monkeypatch.setattr(nlu_rules, "TRIVIAL_WORDS", frozenset())
+    assert fast == nlu_rules.parse_user_text(text)
@@ -0,0 +1,58 @@
+import asyncio
+import os
+
+from chatbot import llm_intent
+from chatbot.llm_intent import DynBatcher
+
+
+def test_batcher_groups_concurrent_calls():
+    batches = []
+
+    async def batch_fn(items):
+        batches.append(list(items))
+        return [f"r:{x}" for x in items]
+
+    async def main():
+        batcher = DynBatcher(batch_fn, max_batch_size=3, max_delay=0.05)
+        return await asyncio.gather(*(batcher.process_batched(i) for i in range(7)))
+
+    results = asyncio.run(main())
+    # every caller gets its own item's result, in order
+    assert results == [f"r:{i}" for i in range(7)]
+    # 7 concurrent items with max_batch_size=3 -> 3 + 3 + 1
+    assert sorted(len(b) for b in batches) == [1, 3, 3]
+    assert sorted(x for b in batches for x in b) == list(range(7))
+
+
+def test_batcher_fans_out_errors():
+    async def batch_fn(items):
+        raise RuntimeError("llm down")
+
+    async def main():
+        batcher = DynBatcher(batch_fn, max_batch_size=4, max_delay=0.01)
+        return await asyncio.gather(
+            *(batcher.process_batched(i) for i in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(main())
+    assert len(results) == 3
+    assert all(isinstance(r, RuntimeError) and str(r) == "llm down" for r in results)
+
+
+def test_disk_cache_roundtrip_and_sweep(tmp_path, monkeypatch):
+    monkeypatch.setattr(llm_intent, "LLM_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(llm_intent, "LLM_CACHE_MAX_FILES", 2)
+    monkeypatch.setattr(llm_intent, "_LLM_CACHE_SWEEP_EVERY", 1)
+
+    paths = [llm_intent._cache_path(f"easy cs {n}", "m") for n in (1, 2, 3)]
+    for age, (p, n) in enumerate(zip(paths, (1, 2, 3))):
+        # every write sweeps down to LLM_CACHE_MAX_FILES, least recently used first
+        llm_intent._cache_write(p, {"class_num": str(n)})
+        os.utime(p, (1_000_000 + age, 1_000_000 + age))
+
+    assert not paths[0].exists()
+    assert llm_intent._cache_read(paths[1]) == {"class_num": "2"}
+    assert llm_intent._cache_read(paths[2]) == {"class_num": "3"}
+    # a different model is a different key
+    assert llm_intent._cache_path("easy cs 1", "other") != paths[0]
+
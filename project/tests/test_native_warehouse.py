@@ -0,0 +1,118 @@
+from pathlib import Path
+import asyncio
+import os
+import queue
+import threading
+import time
+
+import duckdb
+
+from chatbot import actions
+from chatbot.actions import rank_professors
+
+
+def _make_warehouse(tmp_path: Path, first_instructor: str = "Yu, Clement T") -> Path:
+    out = tmp_path / "grades_master.parquet"
+    con = duckdb.connect()
+    try:
+        con.execute(f"""
+            COPY (
+                SELECT * FROM (
+                    VALUES
+                    ('CS','580','Query Process Database Systms','{first_instructor}','FA23',30, 17,7,4,1,0,1),
+                    ('CS','580','Query Process Database Systms','Sintos, Stavros','SP24',31, 28,3,0,0,0,0)
+                ) AS v(subject,class_num,class_title,instructor,semester,total_students,A,B,C,D,F,withdrawn)
+            ) TO '{out.as_posix()}' (FORMAT PARQUET)
+        """)
+    finally:
+        con.close()
+    return out
+
+
+def _cold_start(monkeypatch, pqt: Path) -> None:
+    # a fresh process whose default warehouse is the temp one
+    monkeypatch.setattr(actions, "WAREHOUSE_DEFAULT", pqt)
+    monkeypatch.setattr(actions, "WAREHOUSE_DB", pqt.with_suffix(".duckdb"))
+    monkeypatch.setattr(actions, "_CON", None)
+    monkeypatch.setattr(actions, "_RELATIONS", {})
+    monkeypatch.setattr(actions, "_CURSOR_POOL", queue.Queue())
+
+
+def test_default_warehouse_queries_native_copy(tmp_path, monkeypatch):
+    pqt = _make_warehouse(tmp_path)
+    _cold_start(monkeypatch, pqt)
+
+    rows = rank_professors({"polarity": "easy", "subject": "CS"}, top_n=2)
+
+    assert actions._RELATIONS[pqt.resolve()] == "wh.grades"
+    assert not actions.native_is_stale(pqt, pqt.with_suffix(".duckdb"))
+    assert [r["instructor"] for r in rows] == ["Sintos, Stavros", "Yu, Clement T"]
+
+
+def test_refresh_picks_up_rebuilt_warehouse(tmp_path, monkeypatch):
+    pqt = _make_warehouse(tmp_path)
+    _cold_start(monkeypatch, pqt)
+    params = {"polarity": "hard", "subject": "CS"}
+    assert rank_professors(params, top_n=1)[0]["instructor"] == "Yu, Clement T"
+
+    # rebuild the warehouse with a renamed instructor (newer mtime)
+    _make_warehouse(tmp_path, first_instructor="Renamed, Person")
+    st = pqt.stat()
+    os.utime(pqt, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    actions.refresh_native_warehouse()
+
+    assert actions._RELATIONS[pqt.resolve()] == "wh.grades"
+    assert rank_professors(params, top_n=1)[0]["instructor"] == "Renamed, Person"
+
+
+def test_corrupt_native_copy_is_stale(tmp_path):
+    pqt = _make_warehouse(tmp_path)
+    db = pqt.with_suffix(".duckdb")
+    db.write_bytes(b"not a duckdb file" * 64)
+    assert actions.native_is_stale(pqt, db)
+
+    actions.build_native_warehouse(pqt, db)
+    assert not actions.native_is_stale(pqt, db)
+    # only the finished database is left behind, no temp or WAL files
+    assert sorted(p.name for p in tmp_path.iterdir()) == [db.name, pqt.name]
+
+
+def test_refresh_waits_for_running_queries(tmp_path, monkeypatch):
+    pqt = _make_warehouse(tmp_path)
+    _cold_start(monkeypatch, pqt)
+    actions.warm_up()
+
+    refresher = threading.Thread(target=actions.refresh_native_warehouse)
+    with actions._lease_cursor() as cur:
+        refresher.start()
+        refresher.join(timeout=0.3)
+        # wh must stay attached while a query holds a cursor
+        assert refresher.is_alive()
+        assert cur.execute("SELECT COUNT(*) FROM wh.grades").fetchone()[0] == 2
+    refresher.join(timeout=5)
+    assert not refresher.is_alive()
+    assert actions._RELATIONS[pqt.resolve()] == "wh.grades"
+
+
+def test_interrupt_frees_timed_out_cursor(tmp_path, monkeypatch):
+    _cold_start(monkeypatch, _make_warehouse(tmp_path))
+
+    def slow_query():
+        with actions._lease_cursor() as cur:
+            cur.execute("SELECT SUM(i % 7) FROM range(100000000000) t(i)").fetchall()
+
+    async def main():
+        with actions.tracked_cursors() as leased:
+            try:
+                await asyncio.wait_for(asyncio.to_thread(slow_query), 0.2)
+            except asyncio.TimeoutError:
+                actions.interrupt_cursors(leased)
+            else:
+                raise AssertionError("query should have timed out")
+
+    asyncio.run(main())
+    # the interrupted query hands its cursor back to the pool
+    deadline = time.monotonic() + 5
+    while actions._CURSOR_POOL.qsize() < actions.CURSOR_POOL_SIZE:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
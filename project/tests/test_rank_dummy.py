@@ -1,21 +1,27 @@
 from pathlib import Path
 import duckdb
+import pyarrow as pa
 from chatbot.actions import rank_professors
 
 def _make_dummy_parquet(tmp_path: Path) -> Path:
     out = tmp_path / "dummy.parquet"
     con = duckdb.connect()
     try:
-        # tiny synthetic dataset (two sections)
-        con.execute("""
-            CREATE TABLE t AS
-            SELECT * FROM (
-                VALUES
-                ('CS','580','Query Process Database Systms','Yu, Clement T','FA23',30, 17,7,4,1,0,1),
-                ('CS','580','Query Process Database Systms','Sintos, Stavros','SP24',31, 28,3,0,0,0,0)
-            ) AS v(subject,class_num,class_title,instructor,semester,total_students,A,B,C,D,F,withdrawn);
-        """)
-        con.execute(f"COPY t TO '{out.as_posix()}' (FORMAT PARQUET)")
+        # tiny synthetic dataset (two sections), handed to DuckDB as an Arrow
+        # table rather than spelled out as SQL VALUES
+        v = pa.table({
+            "subject": ["CS", "CS"],
+            "class_num": ["580", "580"],
+            "class_title": ["Query Process Database Systms"] * 2,
+            "instructor": ["Yu, Clement T", "Sintos, Stavros"],
+            "semester": ["FA23", "SP24"],
+            "total_students": [30, 31],
+            "A": [17, 28], "B": [7, 3], "C": [4, 0],
+            "D": [1, 0], "F": [0, 0], "withdrawn": [1, 0],
+        })
+        con.register("v", v)
+        con.execute("CREATE TABLE t AS SELECT * FROM v")
+        con.execute(f"COPY t TO '{out.as_posix()}' (FORMAT PARQUET, CODEC 'zstd')")
     finally:
         con.close()
     return out